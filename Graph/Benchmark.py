@@ -0,0 +1,211 @@
+from contextlib import redirect_stdout
+from Graph import Graph
+import GraphGenerators
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_SIZES = (200, 1000)
+DEFAULT_DENSITIES = (0.005, 0.02)
+
+
+def _write_edge_file(graph, file_name):
+    edges = graph.get_edges()
+    with open(file_name, "w") as file:
+        file.write(f"{graph.get_vertex_bound()} {len(edges)} F F\n")
+        file.writelines(f"{x} {y}\n" for x, y in edges)
+
+
+def _setup_file(n, density, seed, storage, directory):
+    file_name = os.path.join(directory, f"graph_{n}_{density}.txt")
+    if not os.path.exists(file_name):
+        _write_edge_file(GraphGenerators.gnp(n, density, seed=seed, storage="adjacency"), file_name)
+    return file_name, storage
+
+
+def _run_file(state):
+    file_name, storage = state
+    Graph.create_from_file(file_name, storage)
+
+
+def _setup_pairs(n, density, seed, storage, directory):
+    graph = GraphGenerators.gnp(n, density, seed=seed, storage="adjacency")
+    return n, [(x, y) for x, y in graph.get_edges()], storage
+
+
+def _run_growth(state):
+    n, edges, storage = state
+    graph = Graph(False, storage=storage)
+    for _ in range(n):
+        graph.add_vertex()
+    for x, y in edges:
+        graph.add_edge(x, y)
+
+
+def _setup_gnp(n, density, seed, storage, directory):
+    return GraphGenerators.gnp(n, density, seed=seed, storage=storage)
+
+
+def _run_iterator(graph):
+    iterator = graph.iter_vertex(0)
+    iterator.first()
+    while iterator.valid():
+        iterator.next()
+
+
+def _setup_dag(n, density, seed, storage, directory):
+    # A fresh graph per run, so the cached DAG queries are really computed
+    return GraphGenerators.random_dag(n, density, seed=seed, storage=storage)
+
+
+def _run_count_paths(graph):
+    order = graph.topological_sort()
+    graph.count_paths(order[0], order[-1], modulus=10 ** 9 + 7)
+
+
+def _setup_eulerian(n, density, seed, storage, directory):
+    # Shifts x -> x + s (mod n) are permutations, so every vertex keeps in-degree == out-degree
+    rng = random.Random(seed)
+    shifts = [1] + rng.sample(range(2, n), max(0, min(n - 2, round(density * n) - 1)))
+    graph = Graph(False, storage=storage)
+    for _ in range(n):
+        graph.add_vertex()
+    graph.add_edges_bulk((x, (x + shift) % n) for shift in shifts for x in range(n))
+    return graph
+
+
+def _setup_metro(n, density, seed, storage, directory):
+    size = max(3, int(n ** 0.5) // 2)
+    metro = GraphGenerators.metro_network(max(2, n // 50), 25, size, seed=seed)
+    return metro, metro.get_stations()[0]
+
+
+def _run_metro(state):
+    metro, station = state
+    with redirect_stdout(io.StringIO()):
+        metro.dijkstra(station)
+
+
+# name -> (setup(n, density, seed, storage, directory), run(state), uses the density)
+BENCHMARKS = {
+    "create_from_file": (_setup_file, _run_file, True),
+    "growth": (_setup_pairs, _run_growth, True),
+    "iterator": (_setup_gnp, _run_iterator, True),
+    "is_dag": (_setup_dag, lambda graph: graph.is_dag(), True),
+    "topological_sort": (_setup_dag, lambda graph: graph.topological_sort(), True),
+    "count_paths": (_setup_dag, _run_count_paths, True),
+    "eulerian_circuit": (_setup_eulerian, lambda graph: graph.find_eulerian_circuit(), True),
+    "metro_dijkstra": (_setup_metro, _run_metro, False),
+}
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, densities=DEFAULT_DENSITIES, names=None, repeat=3, seed=0,
+                   storage="adjacency"):
+    """Time every benchmark over each size and density.
+
+    Returns {"name/n=.../density=...": {"seconds": best of repeat runs, "peak_bytes": ...}}.
+    Setup is never timed; peak memory comes from one extra run under tracemalloc so the
+    tracing overhead does not distort the timings.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names or BENCHMARKS:
+            if name not in BENCHMARKS:
+                raise ValueError(f"Unknown benchmark: {name}")
+            setup, run, uses_density = BENCHMARKS[name]
+            for n in sizes:
+                for density in densities if uses_density else (None,):
+                    timings = []
+                    for _ in range(repeat):
+                        state = setup(n, density, seed, storage, directory)
+                        start = time.perf_counter()
+                        run(state)
+                        timings.append(time.perf_counter() - start)
+
+                    state = setup(n, density, seed, storage, directory)
+                    tracemalloc.start()
+                    run(state)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+
+                    key = f"{name}/n={n}" + (f"/density={density}" if uses_density else "")
+                    results[key] = {"seconds": min(timings), "peak_bytes": peak}
+    return results
+
+
+def save_baseline(results, file_name, storage="adjacency", seed=0):
+    with open(file_name, "w") as file:
+        json.dump({"python": sys.version.split()[0], "storage": storage, "seed": seed, "results": results},
+                  file, indent=2, sort_keys=True)
+
+
+def load_baseline(file_name, storage="adjacency", seed=0):
+    """Return the results of a baseline, which must have been run with the same storage and seed."""
+    with open(file_name) as file:
+        baseline = json.load(file)
+    if (baseline.get("storage"), baseline.get("seed")) != (storage, seed):
+        # The result keys do not tell the runs apart, so their timings would be compared blindly
+        raise ValueError(f"{file_name} was run with storage={baseline.get('storage')} and seed={baseline.get('seed')}, "
+                         f"not storage={storage} and seed={seed}")
+    return baseline["results"]
+
+
+def find_regressions(results, baseline, tolerance=0.25, min_seconds=0.001):
+    """Return (key, metric, baseline value, new value) for every result worse than tolerance allows.
+
+    Timings below min_seconds in both runs are too noisy to compare and are skipped.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        old = baseline[key]
+        if max(result["seconds"], old["seconds"]) >= min_seconds and \
+                result["seconds"] > old["seconds"] * (1 + tolerance):
+            regressions.append((key, "seconds", old["seconds"], result["seconds"]))
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + tolerance):
+            regressions.append((key, "peak_bytes", old["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Graph, GraphIterator and Metro hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--densities", type=float, nargs="+", default=DEFAULT_DENSITIES)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--storage", default="adjacency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = load_baseline(args.baseline, args.storage, args.seed)
+        except ValueError as error:
+            parser.error(str(error))
+
+    results = run_benchmarks(args.sizes, args.densities, args.only, args.repeat, args.seed, args.storage)
+    for key, result in results.items():
+        print(f"{key:<45} {result['seconds'] * 1000:10.2f} ms {result['peak_bytes'] / 1024:10.1f} KiB")
+    if args.save:
+        save_baseline(results, args.save, args.storage, args.seed)
+
+    if baseline is not None:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.6g} -> {new:.6g}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
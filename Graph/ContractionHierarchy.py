@@ -0,0 +1,237 @@
+from array import array
+import heapq
+import json
+
+INF = float('inf')
+MAGIC = "CONTRACTIONHIERARCHY 1"
+
+
+class ContractionHierarchy:
+    """Contraction hierarchy over the nodes of a weighted graph.
+
+    build() contracts the nodes one by one in order of importance (edge difference plus
+    contracted neighbours) and adds a shortcut u -> x through v whenever a local witness
+    search finds no path as short as u -> v -> x without v. A query then only has to
+    search upwards in the node order from both ends, which settles a tiny part of the
+    graph. Every shortcut remembers the node it skips so routes unpack to real edges.
+    """
+
+    def __init__(self):
+        self.__rank = array("q")
+        # Upward edges in CSR form: forward edges to higher nodes and reversed edges from higher nodes
+        self.__up = None
+        self.__down = None
+        self.__middle = {}
+
+    @staticmethod
+    def build(graph, witness_limit=500):
+        """Preprocess graph; witness_limit caps the nodes a single witness search may settle."""
+        hierarchy = ContractionHierarchy()
+        hierarchy.__contract(graph, witness_limit)
+        return hierarchy
+
+    def get_n(self):
+        return len(self.__rank)
+
+    def __contract(self, graph, witness_limit):
+        bound = graph.get_vertex_bound()
+        out_edges = [{} for _ in range(bound)]
+        in_edges = [{} for _ in range(bound)]
+        for node in graph.vertices():
+            for neighbor, weight in graph.neighbours(node):
+                if neighbor != node:
+                    out_edges[node][neighbor] = (weight, -1)
+                    in_edges[neighbor][node] = (weight, -1)
+
+        contracted_neighbours = [0] * bound
+        up_edges = [[] for _ in range(bound)]
+        down_edges = [[] for _ in range(bound)]
+        rank = array("q", [-1] * bound)
+
+        def shortcuts(node):
+            needed = []
+            for source, (in_weight, _) in in_edges[node].items():
+                limit = in_weight + max((weight for weight, _ in out_edges[node].values()), default=0)
+                witness = self.__witness_search(out_edges, source, node, limit, witness_limit)
+                for target, (out_weight, _) in out_edges[node].items():
+                    if target != source and witness.get(target, INF) > in_weight + out_weight:
+                        needed.append((source, target, in_weight + out_weight))
+            return needed
+
+        def priority(node):
+            return len(shortcuts(node)) - len(in_edges[node]) - len(out_edges[node]) + contracted_neighbours[node]
+
+        queue = [(priority(node), node) for node in graph.vertices()]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            # Lazy update: a node whose priority got worse goes back into the queue
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+
+            for source, target, weight in shortcuts(node):
+                if weight < out_edges[source].get(target, (INF, -1))[0]:
+                    out_edges[source][target] = (weight, node)
+                    in_edges[target][source] = (weight, node)
+
+            rank[node] = order
+            order += 1
+            for target, (weight, middle) in out_edges[node].items():
+                up_edges[node].append((target, weight, middle))
+                del in_edges[target][node]
+                contracted_neighbours[target] += 1
+            for source, (weight, middle) in in_edges[node].items():
+                down_edges[node].append((source, weight, middle))
+                del out_edges[source][node]
+                contracted_neighbours[source] += 1
+            out_edges[node], in_edges[node] = {}, {}
+
+        self.__rank = rank
+        # Integer weights stay integers, so distances match the other routing methods
+        typecode = "q" if all(type(weight) is int and -2 ** 63 <= weight < 2 ** 63
+                              for rows in (up_edges, down_edges) for row in rows for _, weight, _ in row) else "d"
+        self.__up = self.__pack(up_edges, typecode)
+        self.__down = self.__pack(down_edges, typecode)
+        self.__index_middles()
+
+    @staticmethod
+    def __witness_search(out_edges, source, skipped, limit, witness_limit):
+        """Dijkstra from source that avoids skipped and gives up past limit or witness_limit settled nodes."""
+        dist = {source: 0}
+        queue = [(0, source)]
+        settled = 0
+        while queue and settled < witness_limit:
+            current_dist, node = heapq.heappop(queue)
+            if current_dist > dist[node]:
+                continue
+            if current_dist > limit:
+                break
+            settled += 1
+            for neighbor, (weight, _) in out_edges[node].items():
+                if neighbor != skipped and current_dist + weight < dist.get(neighbor, INF):
+                    dist[neighbor] = current_dist + weight
+                    heapq.heappush(queue, (current_dist + weight, neighbor))
+        return dist
+
+    @staticmethod
+    def __pack(rows, typecode):
+        offsets, targets, weights, middles = array("q", [0]), array("q"), array(typecode), array("q")
+        for row in rows:
+            for target, weight, middle in row:
+                targets.append(target)
+                weights.append(weight)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return offsets, targets, weights, middles
+
+    def __index_middles(self):
+        # Maps every hierarchy edge (from, to) to the node it skips, -1 for an original edge
+        self.__middle = {}
+        for (offsets, targets, _, middles), forward in ((self.__up, True), (self.__down, False)):
+            for node in range(len(offsets) - 1):
+                for index in range(offsets[node], offsets[node + 1]):
+                    edge = (node, targets[index]) if forward else (targets[index], node)
+                    self.__middle[edge] = middles[index]
+
+    def __unpack(self, node_path):
+        """Expand the shortcuts of a hierarchy path into original edges."""
+        path = [node_path[0]]
+        for edge_start, edge_end in zip(node_path, node_path[1:]):
+            stack = [(edge_start, edge_end)]
+            while stack:
+                start, end = stack.pop()
+                middle = self.__middle[(start, end)]
+                if middle == -1:
+                    path.append(end)
+                else:
+                    stack.append((middle, end))
+                    stack.append((start, middle))
+        return path
+
+    def query(self, sources, targets):
+        """Shortest path between the source and target node sets.
+
+        Returns (distance, node path), (inf, []) when the targets cannot be reached.
+        """
+        dist = ({}, {})
+        prev = ({}, {})
+        queues = ([], [])
+        for side, nodes in enumerate((sources, targets)):
+            for node in nodes:
+                dist[side][node] = 0
+                prev[side][node] = -1
+                queues[side].append((0, node))
+
+        best, meeting = INF, -1
+        for node in targets:
+            if node in dist[0]:
+                best, meeting = 0, node
+
+        edges = (self.__up, self.__down)
+        while queues[0] or queues[1]:
+            heads = [queue[0][0] if queue else INF for queue in queues]
+            if min(heads) >= best:
+                break
+            side = 0 if heads[0] <= heads[1] else 1
+            current_dist, node = heapq.heappop(queues[side])
+            if current_dist > dist[side][node]:
+                continue
+            offsets, neighbours, weights, _ = edges[side]
+            for index in range(offsets[node], offsets[node + 1]):
+                neighbor, new_dist = neighbours[index], current_dist + weights[index]
+                if new_dist < dist[side].get(neighbor, INF):
+                    dist[side][neighbor] = new_dist
+                    prev[side][neighbor] = node
+                    heapq.heappush(queues[side], (new_dist, neighbor))
+                    if neighbor in dist[1 - side] and new_dist + dist[1 - side][neighbor] < best:
+                        best, meeting = new_dist + dist[1 - side][neighbor], neighbor
+
+        if meeting == -1:
+            return INF, []
+        node_path = []
+        node = meeting
+        while node != -1:
+            node_path.append(node)
+            node = prev[0][node]
+        node_path.reverse()
+        node = prev[1][meeting]
+        while node != -1:
+            node_path.append(node)
+            node = prev[1][node]
+        return best, self.__unpack(node_path)
+
+    def save(self, file_name):
+        """Write the hierarchy: a JSON header line followed by the rank and both packed edge sets."""
+        header = {"format": MAGIC, "nodes": len(self.__rank), "up_edges": len(self.__up[1]),
+                  "down_edges": len(self.__down[1]), "weights": self.__up[2].typecode}
+        with open(file_name, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            self.__rank.tofile(file)
+            for values in self.__up + self.__down:
+                values.tofile(file)
+
+    @staticmethod
+    def load(file_name):
+        hierarchy = ContractionHierarchy()
+        with open(file_name, "rb") as file:
+            header = json.loads(file.readline())
+            if header.get("format") != MAGIC:
+                raise ValueError(f"{file_name} is not a contraction hierarchy")
+            nodes = header["nodes"]
+            typecode = header.get("weights", "d")
+
+            def read(typecode, count):
+                values = array(typecode)
+                values.fromfile(file, count)
+                return values
+
+            hierarchy.__rank = read("q", nodes)
+            packed = []
+            for count in (header["up_edges"], header["down_edges"]):
+                packed.append((read("q", nodes + 1), read("q", count), read(typecode, count), read("q", count)))
+        hierarchy.__up, hierarchy.__down = packed
+        hierarchy.__index_middles()
+        return hierarchy
@@ -1,8 +1,26 @@
+import GraphBinary
+import GraphComponents
+import GraphDense
+import GraphEuler
+import GraphPaths
+import GraphRandom
+import GraphTraversal
+import GraphTrees
+from GraphCache import ConnectivityIndex, DegreeTable, QueryCache, cached_query
+from GraphErrors import NotEulerianError
 from GraphIterator import GraphIterator
+from GraphLoader import read_edge_file
+from GraphProfiler import PROFILER
+from GraphStorage import CSRStorage, make_storage
+from array import array
+from itertools import islice, repeat
+import copy
 import random
 
 
 class TreeNode:
+    __slots__ = ("value", "left", "right")
+
     def __init__(self, value=0):
         self.value = value
         self.left = None
@@ -10,92 +28,299 @@ class TreeNode:
 
 
 class Graph:
-    def __init__(self, reversible: bool, weighted: bool):
-        self.__nodes = 0
+    def __init__(self, reversible: bool, weighted: bool = False, storage="matrix"):
         self.__reversible = reversible
         self.__weighted = weighted
-        self._graph = []
+        self._storage = make_storage(storage)
+        self.__version = 0
+        self._query_cache = QueryCache()
+        self.__degrees = DegreeTable()
+        self.__components = ConnectivityIndex()
+        self.__frozen = False
+        self.__source_storage = None
+        self.__write_storage = None
+
+    def get_version(self):
+        """Return a counter that changes whenever a vertex or an edge is added or removed."""
+        return self.__version
+
+    def __changed(self):
+        if self.__frozen:
+            raise ValueError("The graph is frozen, use thaw() to get a copy that can be changed")
+        if self.__write_storage is not None:
+            # First change of a thawed copy: leave the shared snapshot arrays for its own backend
+            self._storage = self._converted_storage(self.__write_storage)
+            self.__write_storage = None
+        self.__version += 1
+
+    def _changed(self):
+        """Record a change that subclasses keep outside the storage (see _implicit_edges)."""
+        self.__changed()
+        self.__components.invalidate()
+
+    def _implicit_edges(self):
+        """Return the (x, y) edges a subclass adds outside the storage; connectivity counts them too."""
+        return ()
 
     def get_graph(self):
-        return self._graph
+        """Return the graph as an n x n weight matrix (built on demand for sparse backends)."""
+        return self._storage.to_matrix()
+
+    def get_storage(self):
+        return self._storage.name
+
+    def use_storage(self, storage):
+        """Move the graph onto another storage backend ("matrix", "adjacency", "csr" or "numpy")."""
+        if self.__frozen:
+            raise ValueError("The graph is frozen, use thaw() to get a copy that can be changed")
+        self._storage = self._converted_storage(storage)
+        self.__write_storage = None
+
+    def _converted_storage(self, storage):
+        new_storage = make_storage(storage)
+        for _ in range(self.get_vertex_bound()):
+            new_storage.add_vertex()
+        for vertex in range(self.get_vertex_bound()):
+            if not self.is_vertex(vertex):
+                new_storage.remove_vertex(vertex)
+        new_storage.set_edges(self._storage.edges())
+        return new_storage
 
     def add_vertex(self):
-        self.__nodes += 1
-        for row in self._graph:
-            row.append(0)
-        self._graph.append([0] * self.__nodes)
-        return self.__nodes - 1
+        self.__changed()
+        self.__degrees.add_vertex()
+        self.__components.add_vertex()
+        return self._storage.add_vertex()
 
     def add_edge(self, vertex1, vertex2, weight=1):
-        if vertex1 < 0 or vertex2 < 0 or vertex1 >= self.__nodes or vertex2 >= self.__nodes:
+        if not self._storage.is_vertex(vertex1) or not self._storage.is_vertex(vertex2):
             raise ValueError("One or both of the vertices are not in the graph")
         if not self.__weighted:
             weight = 1  # Ensures compatibility with unweighted graphs
-        self._graph[vertex1][vertex2] = weight
+        if PROFILER.enabled:
+            PROFILER.count("graph.add_edge")
+        self.__changed()
+        self.__store_edge(vertex1, vertex2, weight)
+        if self.__reversible:
+            self.__store_edge(vertex2, vertex1, weight)
+
+    def __store_edge(self, x, y, weight):
+        existed = self._storage.weight(x, y) != 0
+        if weight == 0:
+            self._storage.remove_edge(x, y)
+        else:
+            self._storage.set_edge(x, y, weight)
+        self.__degrees.record(x, y, (weight != 0) - existed)
+        self.__components.record(x, y, weight)
+
+    def add_edges_bulk(self, edges):
+        """Add an iterable of (vertex1, vertex2) or (vertex1, vertex2, weight) edges in one batch."""
+        sources, targets, weights = array("q"), array("q"), []
+        for edge in edges:
+            sources.append(edge[0])
+            targets.append(edge[1])
+            weights.append(edge[2] if len(edge) > 2 else 1)
+        self.add_edge_arrays(sources, targets, weights)
+
+    def add_edge_arrays(self, sources, targets, weights=None):
+        """Add the edges sources[i] -> targets[i] (with weights[i]) from parallel arrays.
+
+        The vertices are validated once for the whole batch, before anything is inserted.
+        """
+        if len(sources) != len(targets) or (weights is not None and len(weights) != len(sources)):
+            raise ValueError("The edge arrays must have the same length")
+        self.__check_vertices(sources)
+        self.__check_vertices(targets)
+        if PROFILER.enabled:
+            PROFILER.count("graph.add_edge_arrays")
+            PROFILER.count("graph.bulk_edges", len(sources))
+        if weights is None or not self.__weighted:
+            weights = repeat(1)  # Ensures compatibility with unweighted graphs
+        edges = zip(sources, targets, weights)
         if self.__reversible:
-            self._graph[vertex2][vertex1] = weight
+            edges = ((vertex, neighbour, weight) for vertex1, vertex2, weight in edges
+                     for vertex, neighbour in ((vertex1, vertex2), (vertex2, vertex1)))
+        self.__changed()
+        self.__degrees.invalidate()
+        if self.__components.is_built():
+            edges = self.__components.track(edges)
+        self._storage.set_edges(edges)
+
+    def __check_vertices(self, vertices):
+        if not len(vertices):
+            return
+        if min(vertices) < 0 or max(vertices) >= self.get_vertex_bound() or \
+                (self.get_n() != self.get_vertex_bound() and not all(map(self.is_vertex, vertices))):
+            raise ValueError("One or both of the vertices are not in the graph")
 
     def remove_edge(self, vertex1, vertex2):
-        self._graph[vertex1][vertex2] = 0
+        self.__changed()
+        self.__store_edge(vertex1, vertex2, 0)
         if self.__reversible:
-            self._graph[vertex2][vertex1] = 0
+            self.__store_edge(vertex2, vertex1, 0)
 
     def remove_vertex(self, vertex):
-        if vertex < 0 or vertex >= self.__nodes:
+        """Remove a vertex; the ids of the other vertices stay the same until compact()."""
+        if not self._storage.is_vertex(vertex):
             raise ValueError("The vertex is not in the graph")
-        self.__nodes -= 1
-        self._graph.pop(vertex)
-        for row in self._graph:
-            row.pop(vertex)
-
-    def create_random(self, n, max_weight=10, directed=True, weighted=True):
-        self.__nodes = n
-        self.__reversible = directed
+        self.__changed()
+        self.__degrees.invalidate()
+        self.__components.invalidate()
+        self._storage.remove_vertex(vertex)
+
+    def compact(self):
+        """Renumber the vertices densely after removals and return the old -> new id mapping (-1 if removed)."""
+        self.__changed()
+        self.__degrees.invalidate()
+        self.__components.invalidate()
+        return self._storage.compact()
+
+    def create_random(self, n, max_weight=10, directed=True, weighted=True, p=0.5, seed=None):
+        """Replace the graph with a random G(n, p) graph; the same seed gives the same graph."""
+        rng = random.Random(seed)
+        self.__changed()
+        self.__reversible = not directed
         self.__weighted = weighted
-        self._graph = [[0] * n for _ in range(n)]
-        for i in range(n):
-            for j in range(n):
-                if i != j and random.random() < 0.5:
-                    weight = random.randint(1, max_weight) if self.__weighted else 1
-                    self.add_edge(i, j, weight)
-                    if not directed:
-                        self.add_edge(j, i, weight)
+        self._storage = make_storage(self._storage.name)
+        self.__degrees.invalidate()
+        self.__components.invalidate()
+        for _ in range(n):
+            self._storage.add_vertex()
+        sources, targets = GraphRandom.gnp_pairs(n, p, directed, rng)
+        self.add_edge_arrays(sources, targets, GraphRandom.random_weights(len(sources), max_weight, rng)
+                             if weighted else None)
 
     def get_n(self):
-        return self.__nodes
+        return self._storage.get_n()
+
+    def get_vertex_bound(self):
+        """Return one past the largest vertex id ever handed out (removed ids included)."""
+        return self._storage.get_bound()
+
+    def is_vertex(self, x):
+        return self._storage.is_vertex(x)
+
+    def vertices(self):
+        return self._storage.vertices()
 
     def get_edges(self):
-        edges = []
-        for i in range(self.__nodes):
-            for j in range(self.__nodes):
-                if self._graph[i][j] != 0:
-                    edges.append((i, j, self._graph[i][j]) if self.__weighted else (i, j))
-        return edges
+        return [(i, j, weight) if self.__weighted else (i, j) for i, j, weight in self._storage.edges()]
 
     def deg(self, x):
-        return sum(1 for weight in self._graph[x] if weight != 0)+sum(1 for weight in self._graph if weight[x] != 0)
+        out_degree, in_degree = self.__degrees.get(self._storage)
+        if self.__reversible:
+            # Every undirected edge is stored in both directions, so count it once
+            return out_degree[x]
+        return out_degree[x] + in_degree[x]
+
+    def same_component(self, x, y):
+        """Tell whether x and y are connected, ignoring edge directions."""
+        if not self.is_vertex(x) or not self.is_vertex(y):
+            raise ValueError("One or both of the vertices are not in the graph")
+        components = self.__component_index()
+        return components.find(x) == components.find(y)
+
+    def component_count(self):
+        """Return the number of connected components, ignoring edge directions."""
+        return self.__component_index().get_count()
+
+    def component_size(self, x):
+        """Return the number of vertices in the connected component of x."""
+        if not self.is_vertex(x):
+            raise ValueError("The vertex is not in the graph")
+        return self.__component_index().get_size(x)
+
+    def __component_index(self):
+        return self.__components.get(self._storage, self._implicit_edges)
 
     def is_edge(self, x, y):
-        return self._graph[x][y] != 0
+        return self._storage.weight(x, y) != 0
+
+    def get_weight(self, x, y):
+        return self._storage.weight(x, y)
+
+    def successors(self, x):
+        """Return the vertices reachable from x by one edge, in ascending order."""
+        return self._storage.out_ids(x)
+
+    def predecessors(self, x):
+        """Return the vertices with an edge into x, in ascending order."""
+        return self._storage.in_ids(x)
+
+    def neighbours(self, x):
+        """Return the (neighbour, weight) pairs reachable from x in ascending order."""
+        return self._storage.out_items(x)
+
+    def reverse_neighbours(self, x):
+        """Return the (neighbour, weight) pairs with an edge into x in ascending order."""
+        return self._storage.in_items(x)
 
     def outbound_edges(self, x):
         if self.__reversible:
             return "This function is only available for non-reversible graphs"
-        return [(x, i, self._graph[x][i]) for i in range(self.__nodes) if self._graph[x][i] != 0] if self.__weighted \
-            else [i for i in range(self.__nodes) if self._graph[x][i] != 0]
+        return [(x, i, weight) for i, weight in self._storage.out_items(x)] if self.__weighted \
+            else [i for i, _ in self._storage.out_items(x)]
 
     def inbound_edges(self, x):
         if self.__reversible:
             return "This function is only available for non-reversible graphs."
-        return [(i, x, self._graph[i][x]) for i in range(self.__nodes) if self._graph[i][x] != 0] if self.__weighted \
-            else [i for i in range(self.__nodes) if self._graph[i][x] != 0]
+        return [(i, x, weight) for i, weight in self._storage.in_items(x)] if self.__weighted \
+            else [i for i, _ in self._storage.in_items(x)]
 
     def copy_graph(self):
         new_graph = Graph(self.__reversible, self.__weighted)
-        new_graph.__nodes = self.__nodes
-        new_graph._graph = [row[:] for row in self._graph]
+        new_graph._storage = self._storage.copy()
         return new_graph
 
+    def freeze(self):
+        """Return an immutable snapshot of the graph on packed CSR arrays.
+
+        Every query works on the snapshot and every change raises ValueError. It shares
+        no mutable state with this graph, so any number of threads can read it without
+        locking (and it pickles compactly for other processes).
+        """
+        if self.__frozen:
+            return self
+        storage = self._storage.copy() if self._storage.name == "csr" else self._converted_storage("csr")
+        storage.get_arrays()
+        frozen = copy.copy(self)
+        frozen.__reset(storage)
+        frozen.__frozen = True
+        frozen.__source_storage = self.__write_storage or self._storage.name
+        frozen.__write_storage = None
+        # Built up front so that concurrent readers never race to build them
+        frozen.__degrees.get(storage)
+        frozen.__component_index()
+        return frozen
+
+    def thaw(self):
+        """Return a changeable copy of a frozen graph.
+
+        The copy reads the snapshot's arrays until its first change, which copies them
+        into the storage backend the graph had before freeze() (copy on write).
+        """
+        if not self.__frozen:
+            raise ValueError("Only a frozen graph can be thawed")
+        # The snapshot is passed as the owner of the arrays, so the copy never modifies them in place
+        storage = CSRStorage.from_arrays(self._storage.get_vertex_flags(), self._storage.get_arrays(),
+                                         self._storage.get_in_arrays(), self._storage)
+        thawed = copy.copy(self)
+        thawed.__reset(storage)
+        thawed.__frozen = False
+        if self.__source_storage != "csr":
+            thawed.__write_storage = self.__source_storage
+        return thawed
+
+    def is_frozen(self):
+        return self.__frozen
+
+    def __reset(self, storage):
+        # A snapshot or a thawed copy starts with its own storage and derived tables
+        self._storage = storage
+        self._query_cache = QueryCache()
+        self.__degrees = DegreeTable()
+        self.__components = ConnectivityIndex()
+
     def is_reversible(self):
         return self.__reversible
 
@@ -106,214 +331,182 @@ class Graph:
         return self.__weighted
 
     @staticmethod
-    def create_from_file(file_name):
-        with open(file_name, "r") as file:
-            n, m, reversible, weighted = file.readline().strip().split()
-            n, m = int(n), int(m)
-            reversible = True if reversible == "T" else False
-            weighted = True if weighted == "T" else False
+    def create_from_file(file_name, storage="matrix", use_mmap=False):
+        n, reversible, weighted, sources, targets, weights = read_edge_file(file_name, use_mmap)
+        graph = Graph(reversible, weighted, storage)
 
-            graph = Graph(reversible, weighted)
+        for _ in range(n):
+            graph.add_vertex()
 
-            for _ in range(n):
-                graph.add_vertex()
+        graph.add_edge_arrays(sources, targets, weights)
+        return graph
 
-            for _ in range(m):
-                edge_data = file.readline().strip().split()
-                if weighted:
-                    vertex1, vertex2, weight = int(edge_data[0]), int(edge_data[1]), int(edge_data[2])
-                    graph.add_edge(vertex1, vertex2, weight)
-                else:
-                    vertex1, vertex2 = int(edge_data[0]), int(edge_data[1])
-                    graph.add_edge(vertex1, vertex2)
+    def save_binary(self, file_name, metadata=None):
+        """Save the graph in the memory-mappable binary format of GraphBinary."""
+        storage = self._storage if self._storage.name == "csr" else self._converted_storage("csr")
+        GraphBinary.save_binary(file_name, storage, self.__reversible, self.__weighted, metadata)
 
-            return graph
+    @staticmethod
+    def load_binary(file_name):
+        """Load a graph saved with save_binary; it uses the csr backend over the mapped file."""
+        storage, reversible, weighted, _ = GraphBinary.load_binary(file_name)
+        return Graph(reversible, weighted, storage)
 
     def __str__(self):
         graph_str = ""
-        for i in range(self.__nodes):
-            for j in range(self.__nodes):
-                if self._graph[i][j] != 0:
-                    weight_str = f" Weight: {self._graph[i][j]}" if self.__weighted else ""
-                    graph_str += f"Edge: {i} -> {j}{weight_str}\n"
+        for i, j, weight in self._storage.edges():
+            weight_str = f" Weight: {weight}" if self.__weighted else ""
+            graph_str += f"Edge: {i} -> {j}{weight_str}\n"
         return graph_str.strip()
 
     def __repr__(self):
         return self.__str__()
 
-    def is_dag(self):
-        """Check if the graph is a DAG using DFS."""
-        visited = [False] * self.__nodes
-        rec_stack = [False] * self.__nodes
-
-        def dfs(v):
-            visited[v] = True
-            rec_stack[v] = True
-
-            for i in range(self.__nodes):
-                if self._graph[v][i] != 0:
-                    if not visited[i]:
-                        if dfs(i):
-                            return True
-                    elif rec_stack[i]:
-                        return True
-
-            rec_stack[v] = False
-            return False
+    def reachable(self, start):
+        """Return a flag per vertex id telling whether it can be reached from start."""
+        if not self.is_vertex(start):
+            raise ValueError("The vertex is not in the graph")
+        return GraphDense.reachable(self, start)
 
-        for node in range(self.__nodes):
-            if not visited[node]:
-                if dfs(node):
-                    return False
-        return True
+    def transitive_closure(self):
+        """Return the reachability matrix: a NumPy bool array on the numpy backend, lists otherwise."""
+        return GraphDense.transitive_closure(self)
 
-    def topological_sort(self):
-        """Perform topological sort on the graph."""
-        visited = [False] * self.__nodes
-        stack = []
+    def floyd_warshall(self, predecessors=False):
+        """Return the all pairs distance matrix: a NumPy array on the numpy backend, lists otherwise.
 
-        def dfs(v):
-            visited[v] = True
-            for i in range(self.__nodes):
-                if self._graph[v][i] != 0 and not visited[i]:
-                    dfs(i)
-            stack.append(v)
+        With predecessors it also returns the matrix of the vertex before y on a shortest path from x.
+        """
+        return GraphDense.floyd_warshall(self, predecessors)
 
-        for i in range(self.__nodes):
-            if not visited[i]:
-                dfs(i)
+    @cached_query()
+    def is_dag(self):
+        """Check if the graph is a DAG using DFS."""
+        with PROFILER.timer("graph.is_dag"):
+            return not GraphTraversal.has_cycle(self)
 
+    @cached_query(list)
+    def topological_sort(self):
+        """Perform topological sort on the graph."""
+        with PROFILER.timer("graph.topological_sort"):
+            stack = GraphTraversal.postorder(self)
         stack.reverse()
         return stack
 
-    def count_paths(self, start, end):
-        """Count the number of distinct paths from start to end in a DAG."""
-        if not self.is_dag():
-            return "The graph is not a DAG."
-
-        top_order = self.topological_sort()
-        paths = [0] * self.__nodes
-        paths[start] = 1
-
-        for node in top_order:
-            if paths[node] != 0:
-                for i in range(self.__nodes):
-                    if self._graph[node][i] != 0:
-                        paths[i] += paths[node]
-
-        return paths[end]
+    @cached_query(lambda layers: [list(layer) for layer in layers])
+    def topological_layers(self):
+        """Group the vertices in topological layers with Kahn's algorithm, raises CycleError on a cycle."""
+        return GraphTraversal.kahn_layers(self)
+
+    @cached_query(lambda result: (array("q", result[0]), result[1]))
+    def strongly_connected_components(self):
+        """Return (component id per vertex id, component count) with an iterative Tarjan search.
+
+        Ids follow a topological order of the condensation; removed vertex ids get -1.
+        """
+        return GraphComponents.strongly_connected_components(self)
+
+    def condensation(self):
+        """Return the condensation DAG: one vertex per strongly connected component.
+
+        Component c is vertex c and edges keep the smallest weight between two components,
+        so topological sorts and path counts can run on it when this graph has cycles.
+        """
+        component, count = self.strongly_connected_components()
+        dag = Graph(False, self.__weighted, self._storage.name)
+        for _ in range(count):
+            dag.add_vertex()
+        edges = GraphComponents.condensation_edges(self, component)
+        dag.add_edge_arrays(array("q", (x for x, _ in edges)), array("q", (y for _, y in edges)),
+                            list(edges.values()))
+        return dag
+
+    @cached_query()
+    def _topological_order(self):
+        """Return the Kahn order as a tuple and each vertex's position in it, shared by all path counts."""
+        order = tuple(vertex for layer in self.topological_layers() for vertex in layer)
+        positions = [-1] * self.get_vertex_bound()
+        for position, vertex in enumerate(order):
+            positions[vertex] = position
+        return order, positions
+
+    def count_paths(self, start, end, modulus=None, log_space=False):
+        """Count the number of distinct paths from start to end in a DAG, raises CycleError otherwise.
+
+        With a modulus the count is returned modulo it, with log_space its natural logarithm.
+        """
+        if not self.is_vertex(start) or not self.is_vertex(end):
+            raise ValueError("One or both of the vertices are not in the graph")
+        order, positions = self._topological_order()
+        if positions[end] < positions[start]:
+            order = ()
+        else:
+            # Only the vertices between start and end in the order can lie on a path between them
+            order = islice(order, positions[start], positions[end] + 1)
+        return GraphPaths.count_paths_from(self, start, order, modulus, log_space)[end]
+
+    def count_paths_from(self, start, modulus=None, log_space=False):
+        """Return the number of paths from start to every vertex id, in one sweep."""
+        order, _ = self._topological_order()
+        return GraphPaths.count_paths_from(self, start, order, modulus, log_space)
+
+    def count_paths_to(self, end, modulus=None, log_space=False):
+        """Return the number of paths from every vertex id to end, in one sweep."""
+        order, _ = self._topological_order()
+        return GraphPaths.count_paths_to(self, end, order, modulus, log_space)
 
     def build_tree_from_inorder_preorder(self, inorder, preorder):
+        """Rebuild the binary tree with these traversals and return its root (None if empty).
+
+        Runs in O(n) without recursion and leaves both lists untouched.
+        """
         if not inorder or not preorder:
             return None
 
-        # Helper function to construct the binary tree
-        def build_tree(inorder_map, start, end):
-            if start > end:
-                return None
-
-            # The first element in preorder is the root
-            root_value = preorder.pop(0)
-            root_index = inorder_map[root_value]
-            root = TreeNode(root_value)
-
-            # Build left and right subtrees recursively
-            root.left = build_tree(inorder_map, start, root_index - 1)
-            root.right = build_tree(inorder_map, root_index + 1, end)
-
-            return root
-
-        # Map each value to its index in inorder for O(1) access
-        inorder_map = {value: idx for idx, value in enumerate(inorder)}
-        return build_tree(inorder_map, 0, len(inorder) - 1)
+        left, right = GraphTrees.tree_from_traversals(inorder, preorder)
+        nodes = [TreeNode(value) for value in preorder]
+        for index, node in enumerate(nodes):
+            if left[index] != -1:
+                node.left = nodes[left[index]]
+            if right[index] != -1:
+                node.right = nodes[right[index]]
+        return nodes[0]
 
     def add_tree_edges(self, root):
+        """Add a vertex per tree node in preorder, linked from its parent's value, in one bulk insertion."""
         if not root:
             return
 
-        def add_edges(node):
-            if node.left:
-                left_index = self.add_vertex()
-                self.add_edge(node.value, left_index)
-                add_edges(node.left)
-
-            if node.right:
-                right_index = self.add_vertex()
-                self.add_edge(node.value, right_index)
-                add_edges(node.right)
-
-        root_index = self.add_vertex()
-        self.add_edge(root.value, root_index)
-        add_edges(root)
+        sources, targets = array("q"), array("q")
+        for node, _, parent, _ in GraphTrees.preorder_walk(root):
+            sources.append(parent.value if parent is not None else root.value)
+            targets.append(self.add_vertex())
+        self.add_edge_arrays(sources, targets)
 
     def print_tree(self, root, depth=0, label="Root:"):
         if not root:
             return
-        print(" " * (depth * 2) + label + str(root.value))
-        self.print_tree(root.left, depth + 1, "L---")
-        self.print_tree(root.right, depth + 1, "R---")
+        for node, node_depth, parent, is_left in GraphTrees.preorder_walk(root):
+            if parent is not None:
+                label = "L---" if is_left else "R---"
+            print(" " * ((depth + node_depth) * 2) + label + str(node.value))
 
     def is_eulerian(self):
-        """Check if the graph is Eulerian."""
-        if not self.__is_connected():
-            print("The graph is not connected.")
+        """Check if the graph has an Eulerian circuit."""
+        try:
+            self.__eulerian_start(True)
+        except NotEulerianError:
             return False
-
-        for i in range(self.__nodes):
-            if self.deg(i) % 2 != 0:
-                print(f"Vertex {i} has an odd degree.")
-                return False
-
         return True
 
-    def __is_connected(self):
-        """Check if the graph is connected."""
-        visited = [False] * self.__nodes
-
-        def dfs(v):
-            visited[v] = True
-            for i in range(self.__nodes):
-                if self._graph[v][i] != 0 and not visited[i]:
-                    dfs(i)
-
-        # Find a vertex with a non-zero degree
-        start_vertex = next((i for i in range(self.__nodes) if self.deg(i) > 0), None)
-        if start_vertex is None:
-            return True
-
-        # Perform DFS from the found vertex
-        dfs(start_vertex)
-
-        # Check if all vertices with non-zero degree are connected
-        return all(visited[i] or self.deg(i) == 0 for i in range(self.__nodes))
+    @cached_query()
+    def __eulerian_start(self, closed):
+        return GraphEuler.eulerian_start(self, closed)
 
     def find_eulerian_circuit(self):
-        """Find an Eulerian circuit using Hierholzer's algorithm."""
-        if not self.is_eulerian():
-            return "The graph is not Eulerian."
-
-        graph_copy = self.copy_graph()
-        circuit = []
-        current_path = []
-
-        # Start from any vertex with an edge
-        current_vertex = next((i for i in range(self.__nodes) if self.deg(i) > 0), None)
-        if current_vertex is None:
-            return circuit
-
-        current_path.append(current_vertex)
-
-        while current_path:
-            if any(graph_copy._graph[current_vertex]):
-                next_vertex = graph_copy._graph[current_vertex].index(
-                    next(filter(lambda x: x > 0, graph_copy._graph[current_vertex])))
-                current_path.append(current_vertex)
-                graph_copy.remove_edge(current_vertex, next_vertex)
-                current_vertex = next_vertex
-            else:
-                circuit.append(current_vertex)
-                current_vertex = current_path.pop()
-
-        circuit.reverse()
-        return circuit
+        """Find an Eulerian circuit using Hierholzer's algorithm, raises NotEulerianError if there is none."""
+        return GraphEuler.eulerian_trail(self, self.__eulerian_start(True))
 
+    def find_eulerian_path(self):
+        """Find an Eulerian path (a circuit if there is one), raises NotEulerianError if there is none."""
+        return GraphEuler.eulerian_trail(self, self.__eulerian_start(False))
@@ -0,0 +1,88 @@
+from GraphStorage import CSRStorage, typecode_of
+import json
+import mmap
+import struct
+import sys
+
+MAGIC = b"GRAPHBIN"
+VERSION = 1
+
+# magic, version, byte order, weight typecode, reversible, weighted, vertex bound, edges, metadata length
+_HEADER = struct.Struct("<8sIcc??qqq")
+_HEADER_SIZE = 64
+_BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+def _aligned(size):
+    return (size + 7) // 8 * 8
+
+
+def save_binary(file_name, storage, reversible, weighted, metadata=None):
+    """Write a packed CSR storage to file_name.
+
+    Layout: a 64 byte header, then the outbound offsets/targets/weights arrays, the
+    inbound offsets/sources/weights arrays, one live flag byte per vertex id and an
+    optional JSON metadata blob. Every section starts on an 8 byte boundary so it can
+    be mapped back as a typed memoryview. Weights of mixed types (kept in a list by the
+    storage) are written to the JSON blob instead, with the typecode "O".
+    """
+    offsets, targets, weights = storage.get_arrays()
+    in_offsets, sources, in_weights = storage.get_in_arrays()
+    flags = storage.get_vertex_flags()
+    typecode = "O" if isinstance(weights, list) else typecode_of(weights)
+    if typecode == "O":
+        metadata = {"metadata": metadata, "weights": weights, "in_weights": in_weights}
+        weights = in_weights = b""
+    metadata = json.dumps(metadata).encode() if metadata is not None else b""
+
+    with open(file_name, "wb") as file:
+        header = _HEADER.pack(MAGIC, VERSION, _BYTE_ORDER, typecode.encode(), reversible, weighted,
+                              len(flags), len(targets), len(metadata))
+        file.write(header.ljust(_HEADER_SIZE, b"\0"))
+        for section in (offsets, targets, weights, in_offsets, sources, in_weights, flags, metadata):
+            data = memoryview(section).cast("B")
+            file.write(data)
+            file.write(b"\0" * (_aligned(len(data)) - len(data)))
+
+
+def load_binary(file_name):
+    """Memory-map a file written by save_binary.
+
+    The edge arrays are memoryviews straight over the mapped pages, so processes that
+    load the same file share them and nothing is parsed or copied.
+    Returns (storage, reversible, weighted, metadata).
+    """
+    with open(file_name, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, byte_order, typecode, reversible, weighted, bound, m, metadata_length = \
+        _HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{file_name} is not a binary graph file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary graph version {version}")
+    if byte_order != _BYTE_ORDER:
+        raise ValueError("The binary graph was written on a machine with a different byte order")
+
+    view = memoryview(mapped)
+    position = _HEADER_SIZE
+
+    def take(count, section_format, item_size):
+        nonlocal position
+        section = view[position:position + count * item_size].cast(section_format)
+        position += _aligned(count * item_size)
+        return section
+
+    typecode = typecode.decode()
+    # Mixed type weights live in the JSON blob, their array sections are empty
+    weight_format, weight_count = ("B", 0) if typecode == "O" else (typecode, m)
+    out_arrays = [take(bound + 1, "q", 8), take(m, "q", 8), take(weight_count, weight_format, 8)]
+    in_arrays = [take(bound + 1, "q", 8), take(m, "q", 8), take(weight_count, weight_format, 8)]
+    flags = take(bound, "B", 1)
+    metadata = json.loads(bytes(take(metadata_length, "B", 1))) if metadata_length else None
+    if typecode == "O":
+        out_arrays[2], in_arrays[2] = metadata["weights"], metadata["in_weights"]
+        metadata = metadata["metadata"]
+
+    storage = CSRStorage.from_arrays(flags, out_arrays, in_arrays, mapped)
+    return storage, reversible, weighted, metadata
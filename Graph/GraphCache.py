@@ -0,0 +1,177 @@
+from array import array
+from functools import wraps
+from GraphProfiler import PROFILER
+
+
+class QueryCache:
+    """Results of structural queries, valid for a single graph version."""
+
+    def __init__(self):
+        self._version = None
+        self._results = {}
+
+    def lookup(self, version, key, compute):
+        """Return the cached result for key, computing it first if needed.
+
+        A ValueError raised by compute (e.g. a CycleError) is cached and raised again.
+        """
+        if version != self._version:
+            # A new dict rather than clear(), so a thread still reading the old one is not affected
+            self._results = {}
+            self._version = version
+        results = self._results
+        entry = results.get(key)
+        if PROFILER.enabled:
+            PROFILER.count("cache.hits" if entry is not None else "cache.misses")
+        if entry is None:
+            try:
+                entry = compute(), None
+            except ValueError as error:
+                entry = None, error
+            results[key] = entry
+        result, error = entry
+        if error is not None:
+            # Reset the traceback, or every raise would chain the frames of all the earlier ones
+            raise error.with_traceback(None)
+        return result
+
+    def clear(self):
+        self._version = None
+        self._results.clear()
+
+
+def cached_query(convert=None):
+    """Memoize a Graph method per graph version.
+
+    Mutable results are stored frozen and rebuilt by convert on every call, so callers
+    can never modify the cached copy.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args):
+            result = self._query_cache.lookup(self.get_version(), (method.__name__, args),
+                                              lambda: method(self, *args))
+            return convert(result) if convert is not None else result
+        return wrapper
+    return decorator
+
+
+class DegreeTable:
+    """Out- and in-degree counts kept up to date edge by edge.
+
+    The counts are built lazily from the storage and dropped after changes that are
+    cheaper to recount than to track (bulk insertion, vertex removal).
+    """
+
+    def __init__(self):
+        self._out = None
+        self._in = None
+
+    def invalidate(self):
+        self._out = self._in = None
+
+    def get(self, storage):
+        if self._out is None:
+            out_degrees, self._in = storage.degree_arrays()
+            # Published last, so a concurrent reader that sees it also sees the in-degrees
+            self._out = out_degrees
+        return self._out, self._in
+
+    def add_vertex(self):
+        if self._out is not None:
+            self._out.append(0)
+            self._in.append(0)
+
+    def record(self, x, y, delta):
+        if self._out is not None and delta:
+            self._out[x] += delta
+            self._in[y] += delta
+
+
+class ConnectivityIndex:
+    """Weakly connected components kept up to date edge by edge with disjoint sets.
+
+    Union by rank and path compression make every added edge nearly O(1). A disjoint set
+    forest cannot split again, so removals drop the index and it is rebuilt from the
+    storage on the next query.
+    """
+
+    def __init__(self):
+        self._parent = None
+        self._rank = None
+        self._size = None
+        self._count = 0
+
+    def invalidate(self):
+        self._parent = self._rank = self._size = None
+
+    def is_built(self):
+        return self._parent is not None
+
+    def get(self, storage, extra_edges=None):
+        """Return the index, building it from the storage edges plus extra_edges() if needed."""
+        if self._parent is None:
+            # Built aside and published with the parent array last, so concurrent readers of
+            # a frozen graph never see a half-built forest
+            forest = ConnectivityIndex()
+            bound = storage.get_bound()
+            forest._parent = array("q", range(bound))
+            forest._rank = bytearray(bound)
+            forest._size = array("q", [1]) * bound
+            forest._count = storage.get_n()
+            for x, y, _ in storage.edges():
+                forest.union(x, y)
+            for x, y in extra_edges() if extra_edges is not None else ():
+                forest.union(x, y)
+            self._rank, self._size, self._count = forest._rank, forest._size, forest._count
+            self._parent = forest._parent
+        return self
+
+    def add_vertex(self):
+        if self._parent is not None:
+            self._parent.append(len(self._parent))
+            self._rank.append(0)
+            self._size.append(1)
+            self._count += 1
+
+    def record(self, x, y, weight):
+        if self._parent is None:
+            return
+        if weight == 0:
+            self.invalidate()
+        else:
+            self.union(x, y)
+
+    def track(self, edges):
+        """Pass (x, y, weight) edges through, recording each of them."""
+        for x, y, weight in edges:
+            self.record(x, y, weight)
+            yield x, y, weight
+
+    def find(self, x):
+        parent = self._parent
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return
+        if self._rank[x] < self._rank[y]:
+            x, y = y, x
+        self._parent[y] = x
+        self._size[x] += self._size[y]
+        if self._rank[x] == self._rank[y]:
+            self._rank[x] += 1
+        self._count -= 1
+
+    def get_count(self):
+        return self._count
+
+    def get_size(self, x):
+        return self._size[self.find(x)]
+
@@ -0,0 +1,69 @@
+from array import array
+
+
+def strongly_connected_components(graph):
+    """Iterative Tarjan: return (component id per vertex id, number of components).
+
+    Every vertex is pushed and popped once and every edge looked at once, so it runs in
+    O(n + m) with an explicit stack instead of recursion. Components are numbered in a
+    topological order of the condensation, so edges only go from lower to higher ids.
+    Removed vertex ids get -1.
+    """
+    bound = graph.get_vertex_bound()
+    index = array("q", [-1]) * bound
+    low = array("q", [-1]) * bound
+    component = array("q", [-1]) * bound
+    on_stack = bytearray(bound)
+    stack = []
+    counter = 0
+    count = 0
+
+    for root in graph.vertices():
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(graph.successors(root)))]
+        while work:
+            vertex, successors = work[-1]
+            for successor in successors:
+                if index[successor] == -1:
+                    index[successor] = low[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = 1
+                    work.append((successor, iter(graph.successors(successor))))
+                    break
+                if on_stack[successor] and index[successor] < low[vertex]:
+                    low[vertex] = index[successor]
+            else:
+                work.pop()
+                if work and low[vertex] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[vertex]
+                if low[vertex] == index[vertex]:
+                    # vertex is the root of a component made of everything above it on the stack
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = count
+                        if member == vertex:
+                            break
+                    count += 1
+
+    # Tarjan finishes the sink components first, flip the ids into topological order
+    for vertex in graph.vertices():
+        component[vertex] = count - 1 - component[vertex]
+    return component, count
+
+
+def condensation_edges(graph, component):
+    """Return {(from component, to component): smallest weight} for the edges between components."""
+    edges = {}
+    for vertex in graph.vertices():
+        for successor, weight in graph.neighbours(vertex):
+            pair = (component[vertex], component[successor])
+            if pair[0] != pair[1] and (pair not in edges or weight < edges[pair]):
+                edges[pair] = weight
+    return edges
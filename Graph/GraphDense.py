@@ -0,0 +1,108 @@
+import GraphTraversal
+
+try:
+    import numpy
+except ImportError:  # only the numpy storage backend takes the vectorized paths
+    numpy = None
+
+INF = float('inf')
+
+
+def _dense(graph):
+    return graph.get_storage() == "numpy"
+
+
+def _alive(graph):
+    return numpy.frombuffer(graph._storage.get_vertex_flags(), dtype=numpy.uint8).astype(bool)
+
+
+def reachable(graph, start):
+    """Return a flag per vertex id telling whether it can be reached from start.
+
+    On the numpy backend this is a breadth-first search with one array step per level:
+    the next frontier is every unvisited column with an edge from the current one.
+    """
+    if not _dense(graph):
+        return GraphTraversal.reachable(graph, start)
+    present = graph._storage.get_array() != 0
+    visited = numpy.zeros(len(present), dtype=bool)
+    visited[start] = True
+    frontier = visited.copy()
+    while frontier.any():
+        frontier = present[frontier].any(axis=0) & ~visited
+        visited |= frontier
+    return bytearray(visited.astype(numpy.uint8).tobytes())
+
+
+def transitive_closure(graph):
+    """closure[x][y] tells whether y can be reached from x; every vertex reaches itself.
+
+    On the numpy backend the reachability matrix is squared with matrix products until
+    it stops changing, which takes O(log n) products. Otherwise it runs a search from
+    every vertex and returns lists.
+    """
+    if not _dense(graph):
+        bound = graph.get_vertex_bound()
+        closure = [[False] * bound for _ in range(bound)]
+        for x in graph.vertices():
+            closure[x] = [flag == 1 for flag in GraphTraversal.reachable(graph, x)]
+        return closure
+
+    closure = graph._storage.get_array() != 0
+    alive = numpy.flatnonzero(_alive(graph))
+    closure[alive, alive] = True
+    while True:
+        # float32 products go through BLAS, a positive entry means a path of up to twice the length
+        squared = closure.astype(numpy.float32) @ closure.astype(numpy.float32) > 0
+        if numpy.array_equal(squared, closure):
+            return closure
+        closure = squared
+
+
+def floyd_warshall(graph, predecessors=False):
+    """All pairs shortest distances, inf where there is no path.
+
+    With predecessors it returns (dist, prev), prev[x][y] being the vertex before y on a
+    shortest path from x (-1 if there is none). Edges are read through graph.neighbours,
+    so the transfers a Metro adds on the fly count too. With NumPy every pivot relaxes
+    the whole matrix in one array operation, otherwise it runs the plain triple loop.
+    The results are NumPy arrays on the numpy backend and lists otherwise.
+    """
+    bound = graph.get_vertex_bound()
+    if numpy is not None:
+        dist = numpy.full((bound, bound), INF)
+        prev = numpy.full((bound, bound), -1, dtype=numpy.int64) if predecessors else None
+    else:
+        dist = [[INF] * bound for _ in range(bound)]
+        prev = [[-1] * bound for _ in range(bound)] if predecessors else None
+    for x in graph.vertices():
+        dist[x][x] = 0
+        for y, weight in graph.neighbours(x):
+            if weight < dist[x][y]:
+                dist[x][y] = weight
+                if predecessors:
+                    prev[x][y] = x
+
+    if numpy is not None:
+        for k in range(bound):
+            through = dist[:, k, None] + dist[None, k, :]
+            if predecessors:
+                better = through < dist
+                prev = numpy.where(better, prev[None, k, :], prev)
+            numpy.minimum(dist, through, out=dist)
+        if not _dense(graph):
+            dist, prev = dist.tolist(), prev.tolist() if predecessors else None
+    else:
+        for k in range(bound):
+            dist_k, prev_k = dist[k], prev[k] if predecessors else None
+            for i in range(bound):
+                dist_ik = dist[i][k]
+                if dist_ik == INF:
+                    continue
+                dist_i, prev_i = dist[i], prev[i] if predecessors else None
+                for j in range(bound):
+                    if dist_ik + dist_k[j] < dist_i[j]:
+                        dist_i[j] = dist_ik + dist_k[j]
+                        if predecessors:
+                            prev_i[j] = prev_k[j]
+    return (dist, prev) if predecessors else dist
@@ -0,0 +1,10 @@
+class CycleError(ValueError):
+    """Raised when an algorithm that needs a DAG meets a cycle; cycle holds its vertices in edge order."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__("The graph is not a DAG, it has the cycle " + " -> ".join(map(str, cycle + cycle[:1])))
+
+
+class NotEulerianError(ValueError):
+    """Raised when the graph has no Eulerian circuit (or path) to find."""
@@ -0,0 +1,99 @@
+from GraphErrors import NotEulerianError
+import GraphTraversal
+
+
+def _degree_balance(graph):
+    """Return, per vertex id, the (out - in) balance for directed graphs or the degree for undirected ones.
+
+    The second list flags the vertices that have at least one edge.
+    """
+    balance = [0] * graph.get_vertex_bound()
+    touched = bytearray(graph.get_vertex_bound())
+    for vertex in graph.vertices():
+        for successor in graph.successors(vertex):
+            touched[vertex] = touched[successor] = 1
+            if graph.is_reversible():
+                # A self loop adds two to the degree, any other stored direction adds one
+                balance[vertex] += 2 if successor == vertex else 1
+            else:
+                balance[vertex] += 1
+                balance[successor] -= 1
+    return balance, touched
+
+
+def eulerian_start(graph, closed=True):
+    """Return the vertex an Eulerian circuit (closed) or path starts from, None if there are no edges.
+
+    Raises NotEulerianError with the reason when there is none.
+    """
+    balance, touched = _degree_balance(graph)
+    if graph.is_reversible():
+        unbalanced = [vertex for vertex in graph.vertices() if balance[vertex] % 2 != 0]
+        if unbalanced and (closed or len(unbalanced) != 2):
+            raise NotEulerianError(f"Vertex {unbalanced[0]} has an odd degree.")
+        start = unbalanced[0] if unbalanced else None
+    else:
+        unbalanced = [vertex for vertex in graph.vertices() if balance[vertex] != 0]
+        starts = [vertex for vertex in unbalanced if balance[vertex] == 1]
+        ends = [vertex for vertex in unbalanced if balance[vertex] == -1]
+        if unbalanced and (closed or len(unbalanced) != 2 or len(starts) != 1 or len(ends) != 1):
+            raise NotEulerianError(f"Vertex {unbalanced[0]} has different in and out degrees.")
+        start = starts[0] if starts else None
+
+    has_edges = [vertex for vertex in graph.vertices() if touched[vertex]]
+    if not has_edges:
+        return None
+    if start is None:
+        start = has_edges[0]
+
+    visited = GraphTraversal.reachable(graph, start)
+    if not all(visited[vertex] for vertex in has_edges):
+        raise NotEulerianError("The graph is not connected.")
+    return start
+
+
+def eulerian_trail(graph, start):
+    """Hierholzer's algorithm in O(n + m), from a start vertex given by eulerian_start.
+
+    Every vertex keeps a cursor into its list of incident edges, so each edge is
+    looked at a constant number of times and the graph itself is never copied or
+    modified. Undirected edges get an id so that using one direction retires both.
+    """
+    if start is None:
+        return []
+
+    reversible = graph.is_reversible()
+    incident = [[] for _ in range(graph.get_vertex_bound())]
+    edge_count = 0
+    for vertex in graph.vertices():
+        for successor in graph.successors(vertex):
+            if not reversible:
+                incident[vertex].append((successor, edge_count))
+                edge_count += 1
+            elif vertex <= successor:
+                incident[vertex].append((successor, edge_count))
+                # A self loop is listed twice as well, its degree counts it twice
+                incident[successor].append((vertex, edge_count))
+                edge_count += 1
+
+    used = bytearray(edge_count)
+    cursor = [0] * len(incident)
+    trail = []
+    stack = [start]
+    while stack:
+        vertex = stack[-1]
+        edges = incident[vertex]
+        position = cursor[vertex]
+        while position < len(edges) and used[edges[position][1]]:
+            position += 1
+        if position < len(edges):
+            successor, edge = edges[position]
+            used[edge] = 1
+            cursor[vertex] = position + 1
+            stack.append(successor)
+        else:
+            cursor[vertex] = position
+            trail.append(stack.pop())
+
+    trail.reverse()
+    return trail
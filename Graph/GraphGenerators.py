@@ -0,0 +1,72 @@
+from Graph import Graph
+from Metro import Metro
+import GraphRandom
+import random
+
+
+def _build(n, directed, weighted, storage, pairs, max_weight, rng):
+    """Create a graph with n vertices and insert the sampled pairs in one bulk call."""
+    graph = Graph(not directed, weighted, storage)
+    for _ in range(n):
+        graph.add_vertex()
+    sources, targets = pairs
+    graph.add_edge_arrays(sources, targets, GraphRandom.random_weights(len(sources), max_weight, rng)
+                          if weighted else None)
+    return graph
+
+
+def gnp(n, p, directed=True, weighted=False, max_weight=10, seed=None, storage="matrix"):
+    """Erdos-Renyi G(n, p): every possible edge is present with probability p, in O(n + m)."""
+    rng = random.Random(seed)
+    return _build(n, directed, weighted, storage, GraphRandom.gnp_pairs(n, p, directed, rng), max_weight, rng)
+
+
+def gnm(n, m, directed=True, weighted=False, max_weight=10, seed=None, storage="matrix"):
+    """G(n, m): exactly m edges picked uniformly among all possible ones."""
+    rng = random.Random(seed)
+    return _build(n, directed, weighted, storage, GraphRandom.gnm_pairs(n, m, directed, rng), max_weight, rng)
+
+
+def barabasi_albert(n, m, weighted=False, max_weight=10, seed=None, storage="matrix"):
+    """Undirected scale-free graph grown by preferential attachment, m edges per new vertex."""
+    rng = random.Random(seed)
+    return _build(n, False, weighted, storage, GraphRandom.barabasi_albert_pairs(n, m, rng), max_weight, rng)
+
+
+def random_dag(n, p, weighted=False, max_weight=10, seed=None, storage="matrix"):
+    """Directed acyclic graph: G(n, p) keeping only edges that go forward in a random vertex order."""
+    rng = random.Random(seed)
+    return _build(n, True, weighted, storage, GraphRandom.dag_pairs(n, p, rng), max_weight, rng)
+
+
+def grid(rows, columns, weighted=False, max_weight=10, seed=None, storage="matrix"):
+    """Undirected rows x columns grid, cell (r, c) is vertex r * columns + c."""
+    rng = random.Random(seed)
+    return _build(rows * columns, False, weighted, storage, GraphRandom.grid_pairs(rows, columns), max_weight, rng)
+
+
+def metro_network(lines, stations_per_line, size, max_weight=10, seed=None, transfers="clique"):
+    """Metro with stations on a size x size grid and lines that wander across it.
+
+    Every line starts at a random station and keeps stepping to an unvisited neighbouring
+    station until it has stations_per_line stops or gets stuck. Station (x, y) is named
+    s<y * size + x> and gets (x, y) as its coordinates for A*.
+    """
+    rng = random.Random(seed)
+    metro = Metro(transfers=transfers)
+    for line in range(lines):
+        x, y = rng.randrange(size), rng.randrange(size)
+        visited = {(x, y)}
+        stops = [(f"s{y * size + x}", 0)]
+        while len(stops) < stations_per_line:
+            steps = [(x + dx, y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                     if 0 <= x + dx < size and 0 <= y + dy < size and (x + dx, y + dy) not in visited]
+            if not steps:
+                break
+            x, y = rng.choice(steps)
+            visited.add((x, y))
+            stops.append((f"s{y * size + x}", rng.randint(1, max_weight)))
+        metro.add_line(f"M{line + 1}", stops)
+    metro.set_station_coordinates({station: (int(station[1:]) % size, int(station[1:]) // size)
+                                   for station in metro.get_stations()})
+    return metro
@@ -1,4 +1,14 @@
+import GraphTraversal
+from GraphProfiler import PROFILER
+
+
 class GraphIterator:
+    """Traversal from start_vertex.
+
+    first/next/valid/get_current walk the vertices one call at a time. Iterating over the
+    iterator (or over dfs()/bfs()) instead yields (vertex, depth, parent) tuples lazily.
+    """
+
     def __init__(self, graph, start_vertex):
         self.graph = graph
         self.start_vertex = start_vertex
@@ -19,8 +29,13 @@ class GraphIterator:
             self.current_vertex = None
             return
         self.current_vertex, current_depth = self.stack.pop()
-        for neighbour in range(self.graph.get_n() - 1, -1, -1):
-            if self.graph.is_edge(self.current_vertex, neighbour) and neighbour not in self.visited:
+        successors = self.graph.successors(self.current_vertex)
+        if PROFILER.enabled:
+            PROFILER.count("iterator.next")
+            PROFILER.count("iterator.neighbour_probes", len(successors))
+        # Push in descending order so the smallest neighbour is popped first
+        for neighbour in reversed(successors):
+            if neighbour not in self.visited:
                 self.stack.append((neighbour, current_depth + 1))
                 self.visited.add(neighbour)
                 self.vertex_depth[neighbour] = current_depth + 1
@@ -38,4 +53,13 @@ class GraphIterator:
     def valid(self):
         return self.current_vertex is not None or bool(self.stack)
 
+    def __iter__(self):
+        return self.dfs()
+
+    def dfs(self, max_depth=None):
+        """Generator of the depth-first (vertex, depth, parent) tuples, see GraphTraversal.depth_first."""
+        return GraphTraversal.depth_first(self.graph, self.start_vertex, max_depth)
 
+    def bfs(self, max_depth=None):
+        """Generator of the breadth-first (vertex, depth, parent) tuples, see GraphTraversal.breadth_first."""
+        return GraphTraversal.breadth_first(self.graph, self.start_vertex, max_depth)
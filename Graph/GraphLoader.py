@@ -0,0 +1,62 @@
+from array import array
+import mmap
+
+
+def _parse_lines(lines, values, fields, needed):
+    """Append the first fields integers of every line to values; True once needed are read."""
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) < fields:
+            raise ValueError(f"Expected {fields} numbers on the edge line {line.decode().strip()!r}")
+        # Extra columns are ignored, as the line by line reader did
+        values.extend(map(int, tokens[:fields]))
+        if len(values) >= needed:
+            return True
+    return False
+
+
+def _parse_chunks(chunks, values, fields, needed):
+    """Parse the edge lines from byte chunks into values until needed integers are read."""
+    tail = b""
+    for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        # The last line of a chunk may have been cut in half
+        tail = lines.pop()
+        if _parse_lines(lines, values, fields, needed):
+            return
+    if tail.strip():
+        _parse_lines([tail], values, fields, needed)
+
+
+def read_edge_file(file_name, use_mmap=False, chunk_size=1 << 20):
+    """Read a graph file in the "n m T/F T/F" format straight into arrays.
+
+    The edge lines are parsed in buffered chunks (or from a memory-mapped view of the
+    file when use_mmap is set) instead of line by line.
+    Returns (n, reversible, weighted, sources, targets, weights), weights is None for
+    unweighted graphs.
+    """
+    with open(file_name, "rb") as file:
+        n, m, reversible, weighted = file.readline().split()
+        n, m = int(n), int(m)
+        reversible = reversible == b"T"
+        weighted = weighted == b"T"
+        fields = 3 if weighted else 2
+        needed = m * fields
+
+        values = array("q")
+        if use_mmap:
+            offset = file.tell()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                chunks = (mapped[start:start + chunk_size] for start in range(offset, len(mapped), chunk_size))
+                _parse_chunks(chunks, values, fields, needed)
+        else:
+            _parse_chunks(iter(lambda: file.read(chunk_size), b""), values, fields, needed)
+
+    if len(values) < needed:
+        raise ValueError(f"Expected {m} edges in {file_name}, found {len(values) // fields}")
+
+    sources = values[0:needed:fields]
+    targets = values[1:needed:fields]
+    weights = values[2:needed:fields] if weighted else None
+    return n, reversible, weighted, sources, targets, weights
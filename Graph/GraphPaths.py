@@ -0,0 +1,66 @@
+import math
+
+
+def _check_mode(modulus, log_space):
+    if modulus is not None and log_space:
+        raise ValueError("Choose either a modulus or log-space counting, not both")
+    if modulus is not None and modulus < 1:
+        raise ValueError("The modulus must be a positive integer")
+
+
+def _log_add(a, b):
+    """Return log(exp(a) + exp(b)) without leaving log space."""
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(math.exp(b - a))
+
+
+def _sweep(graph, order, seed, modulus, log_space, push):
+    """Propagate path counts along order, push=True sends counts forward to successors, else pulls them back."""
+    zero = -math.inf if log_space else 0
+    counts = [zero] * graph.get_vertex_bound()
+    counts[seed] = 0.0 if log_space else 1
+    for vertex in order:
+        if push:
+            count = counts[vertex]
+            if count == zero:
+                continue
+            for successor in graph.successors(vertex):
+                if log_space:
+                    counts[successor] = _log_add(counts[successor], count)
+                elif modulus is None:
+                    counts[successor] += count
+                else:
+                    counts[successor] = (counts[successor] + count) % modulus
+        else:
+            for successor in graph.successors(vertex):
+                count = counts[successor]
+                if count == zero:
+                    continue
+                if log_space:
+                    counts[vertex] = _log_add(counts[vertex], count)
+                elif modulus is None:
+                    counts[vertex] += count
+                else:
+                    counts[vertex] = (counts[vertex] + count) % modulus
+    if modulus is not None:
+        counts[seed] %= modulus
+    return counts
+
+
+def count_paths_from(graph, source, order, modulus=None, log_space=False):
+    """Count the paths from source to every vertex in one O(n + m) sweep over a topological order.
+
+    Exact counts are Python integers; with a modulus they are reduced modulo it, with
+    log_space the natural logarithm of each count is kept instead (-inf for no path).
+    """
+    _check_mode(modulus, log_space)
+    return _sweep(graph, order, source, modulus, log_space, True)
+
+
+def count_paths_to(graph, target, order, modulus=None, log_space=False):
+    """Count the paths from every vertex to target in one O(n + m) sweep backwards over a topological order."""
+    _check_mode(modulus, log_space)
+    return _sweep(graph, reversed(order), target, modulus, log_space, False)
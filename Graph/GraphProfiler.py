@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+import time
+
+
+class Profiler:
+    """Opt-in operation counters, timers and trace callbacks.
+
+    Instrumented code checks the enabled flag before recording anything, so a disabled
+    profiler costs one attribute read per operation. Trace callbacks are called as
+    callback(name, value) for every count and every finished timer.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._counters = {}
+        self._timers = {}
+        self._traces = []
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self._counters = {}
+        self._timers = {}
+
+    def add_trace(self, callback):
+        self._traces.append(callback)
+
+    def remove_trace(self, callback):
+        self._traces.remove(callback)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        self._counters[name] = self._counters.get(name, 0) + amount
+        for callback in self._traces:
+            callback(name, amount)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the with block under name (a call count and the total seconds)."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record_time(name, 1, time.perf_counter() - start)
+
+    def _record_time(self, name, calls, seconds):
+        total_calls, total_seconds = self._timers.get(name, (0, 0.0))
+        self._timers[name] = (total_calls + calls, total_seconds + seconds)
+        for callback in self._traces:
+            callback(name, seconds)
+
+    def snapshot(self):
+        """Return {"counters": {name: count}, "timers": {name: {"calls": ..., "seconds": ...}}}."""
+        return {"counters": dict(self._counters),
+                "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self._timers.items()}}
+
+    @contextmanager
+    def scope(self):
+        """Profile just the with block, e.g. a single query.
+
+        Yields a dict that receives the snapshot of the block on exit. Profiling is on
+        inside the block; if it was on outside too, the block's numbers are also added
+        to the outer totals.
+        """
+        enabled, counters, timers = self.enabled, self._counters, self._timers
+        self.enabled, self._counters, self._timers = True, {}, {}
+        result = {}
+        try:
+            yield result
+        finally:
+            result.update(self.snapshot())
+            self.enabled, self._counters, self._timers = enabled, counters, timers
+            if enabled:
+                for name, amount in result["counters"].items():
+                    counters[name] = counters.get(name, 0) + amount
+                for name, timing in result["timers"].items():
+                    total_calls, total_seconds = timers.get(name, (0, 0.0))
+                    timers[name] = (total_calls + timing["calls"], total_seconds + timing["seconds"])
+
+
+PROFILER = Profiler()
@@ -0,0 +1,126 @@
+from array import array
+import math
+
+
+def _skips(p, rng):
+    """Yield the gaps between successive hits of independent p-trials (geometric skipping).
+
+    Each hit costs one random number, so sampling m edges out of N pairs takes O(m)
+    instead of O(N). A gap of 0 means the very next trial is a hit.
+    """
+    log_q = math.log(1 - p)
+    while True:
+        yield int(math.log(1 - rng.random()) / log_q)
+
+
+def gnp_pairs(n, p, directed, rng):
+    """Sample G(n, p) without self loops, returns (sources, targets) arrays.
+
+    Directed graphs draw from the n(n - 1) ordered pairs, undirected ones from the
+    n(n - 1) / 2 pairs w < v (each stored once, the caller mirrors it).
+    """
+    if not 0 <= p <= 1:
+        raise ValueError("The edge probability must be between 0 and 1")
+    sources, targets = array("q"), array("q")
+    if p == 0 or n < 2:
+        return sources, targets
+    if p == 1:
+        for v in range(n):
+            for w in range(n) if directed else range(v):
+                if v != w:
+                    sources.append(v)
+                    targets.append(w)
+        return sources, targets
+
+    if directed:
+        total = n * (n - 1)
+        index = -1
+        for skip in _skips(p, rng):
+            index += skip + 1
+            if index >= total:
+                break
+            # Row v has n - 1 slots, one per vertex other than v itself
+            v, w = divmod(index, n - 1)
+            sources.append(v)
+            targets.append(w + (w >= v))
+        return sources, targets
+
+    # Batagelj and Brandes: walk the lower triangle row by row
+    v, w = 1, -1
+    for skip in _skips(p, rng):
+        w += skip + 1
+        while w >= v and v < n:
+            w -= v
+            v += 1
+        if v >= n:
+            break
+        sources.append(v)
+        targets.append(w)
+    return sources, targets
+
+
+def gnm_pairs(n, m, directed, rng):
+    """Sample m distinct pairs uniformly (G(n, m)), returns (sources, targets) arrays."""
+    total = n * (n - 1) if directed else n * (n - 1) // 2
+    if not 0 <= m <= total:
+        raise ValueError(f"A graph with {n} vertices has room for at most {total} edges")
+    sources, targets = array("q"), array("q")
+    for index in sorted(rng.sample(range(total), m)):
+        if directed:
+            v, w = divmod(index, n - 1)
+            w += w >= v
+        else:
+            # index enumerates the pairs w < v as v(v - 1) / 2 + w
+            v = (1 + math.isqrt(1 + 8 * index)) // 2
+            w = index - v * (v - 1) // 2
+        sources.append(v)
+        targets.append(w)
+    return sources, targets
+
+
+def barabasi_albert_pairs(n, m, rng):
+    """Preferential attachment: every new vertex links to m distinct earlier ones, chosen by degree."""
+    if not 1 <= m < n:
+        raise ValueError("Each new vertex needs 1 <= m < n earlier vertices to attach to")
+    sources, targets = array("q"), array("q")
+    # Every vertex appears here once per incident edge, so a uniform pick is degree-proportional
+    repeated = []
+    chosen = list(range(m))
+    for v in range(m, n):
+        for w in chosen:
+            sources.append(v)
+            targets.append(w)
+        repeated.extend(chosen)
+        repeated.extend([v] * m)
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(rng.choice(repeated))
+        chosen = sorted(chosen)
+    return sources, targets
+
+
+def dag_pairs(n, p, rng):
+    """G(n, p) restricted to the edges that go forward in a random vertex order."""
+    higher, lower = gnp_pairs(n, p, False, rng)
+    order = list(range(n))
+    rng.shuffle(order)
+    return array("q", (order[w] for w in lower)), array("q", (order[v] for v in higher))
+
+
+def grid_pairs(rows, columns):
+    """Edges between horizontally and vertically adjacent cells, cell (r, c) is vertex r * columns + c."""
+    sources, targets = array("q"), array("q")
+    for row in range(rows):
+        for column in range(columns):
+            vertex = row * columns + column
+            if column + 1 < columns:
+                sources.append(vertex)
+                targets.append(vertex + 1)
+            if row + 1 < rows:
+                sources.append(vertex)
+                targets.append(vertex + columns)
+    return sources, targets
+
+
+def random_weights(count, max_weight, rng):
+    return array("q", (rng.randint(1, max_weight) for _ in range(count)))
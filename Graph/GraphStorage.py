@@ -0,0 +1,650 @@
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy
+except ImportError:  # the numpy backend is optional
+    numpy = None
+
+
+def _weight_array(weights):
+    """Pack weights into a typed array when one type fits them all, else keep a plain list.
+
+    Integer weights become int64 and float weights float64. A mix of the two, or integers
+    beyond 64 bits, stay in a list so that every weight keeps its own type and value.
+    """
+    types = set(map(type, weights))
+    if types <= {int}:
+        try:
+            return array("q", weights)
+        except OverflowError:
+            return list(weights)
+    if types == {float}:
+        return array("d", weights)
+    return list(weights)
+
+
+def _copy_weights(weights):
+    return list(weights) if isinstance(weights, list) else array(typecode_of(weights), weights)
+
+
+def typecode_of(values):
+    """Return the element typecode of an array or a memoryview."""
+    return values.typecode if isinstance(values, array) else values.format
+
+
+class VertexTable:
+    """Stable vertex ids for a storage backend.
+
+    Ids are handed out in increasing order from a flag array whose capacity doubles
+    when it fills up. Removing a vertex only tombstones its id, so the remaining ids
+    never shift; compact() renumbers the live vertices densely on request.
+    """
+
+    def __init__(self):
+        self._alive = bytearray()
+        self._bound = 0
+        self._count = 0
+
+    def add(self):
+        if self._bound == len(self._alive):
+            self._alive.extend(bytes(max(1, len(self._alive))))
+        vertex = self._bound
+        self._alive[vertex] = 1
+        self._bound += 1
+        self._count += 1
+        return vertex
+
+    def remove(self, vertex):
+        self._alive[vertex] = 0
+        self._count -= 1
+
+    def is_alive(self, vertex):
+        return 0 <= vertex < self._bound and self._alive[vertex] == 1
+
+    def get_count(self):
+        return self._count
+
+    def get_bound(self):
+        return self._bound
+
+    def __iter__(self):
+        if self._count == self._bound:
+            return iter(range(self._bound))
+        alive = self._alive
+        return (vertex for vertex in range(self._bound) if alive[vertex])
+
+    def compact(self):
+        """Renumber the live ids as 0..count-1 and return the old -> new mapping (-1 if removed)."""
+        mapping = [-1] * self._bound
+        for new_vertex, vertex in enumerate(self):
+            mapping[vertex] = new_vertex
+        self._alive = bytearray(b"\x01" * self._count)
+        self._bound = self._count
+        return mapping
+
+    def get_flags(self):
+        """Return one byte per id handed out, 1 for a live vertex and 0 for a removed one."""
+        return bytes(self._alive[:self._bound])
+
+    @staticmethod
+    def from_flags(flags):
+        table = VertexTable()
+        table._alive = bytearray(flags)
+        table._bound = len(flags)
+        table._count = sum(table._alive)
+        return table
+
+    def copy(self):
+        new_table = VertexTable()
+        new_table._alive = bytearray(self._alive)
+        new_table._bound = self._bound
+        new_table._count = self._count
+        return new_table
+
+
+class _Storage:
+    """Vertex bookkeeping shared by every storage backend."""
+
+    def __init__(self):
+        self._vertices = VertexTable()
+
+    def get_n(self):
+        return self._vertices.get_count()
+
+    def get_bound(self):
+        return self._vertices.get_bound()
+
+    def is_vertex(self, vertex):
+        return self._vertices.is_alive(vertex)
+
+    def vertices(self):
+        return iter(self._vertices)
+
+    def get_vertex_flags(self):
+        return self._vertices.get_flags()
+
+    def set_edges(self, edges):
+        for x, y, weight in edges:
+            self.set_edge(x, y, weight)
+
+    def degree_arrays(self):
+        """Return the out- and in-degree of every vertex id as arrays."""
+        out_degree = array("q", bytes(8 * self.get_bound()))
+        in_degree = array("q", bytes(8 * self.get_bound()))
+        for x, y, _ in self.edges():
+            out_degree[x] += 1
+            in_degree[y] += 1
+        return out_degree, in_degree
+
+
+class MatrixStorage(_Storage):
+    """Dense weight matrix, a 0 cell marks a missing edge.
+
+    Rows are allocated up to a capacity that doubles when it fills, so adding a vertex
+    does not have to touch every existing row.
+    """
+
+    name = "matrix"
+
+    def __init__(self):
+        super().__init__()
+        self._matrix = []
+
+    def add_vertex(self):
+        vertex = self._vertices.add()
+        if vertex == len(self._matrix):
+            self.__grow(max(1, 2 * len(self._matrix)))
+        return vertex
+
+    def __grow(self, capacity):
+        extra = capacity - len(self._matrix)
+        for row in self._matrix:
+            row.extend([0] * extra)
+        self._matrix.extend([0] * capacity for _ in range(extra))
+
+    def remove_vertex(self, vertex):
+        self._matrix[vertex] = [0] * len(self._matrix)
+        for row in self._matrix:
+            row[vertex] = 0
+        self._vertices.remove(vertex)
+
+    def compact(self):
+        mapping = self._vertices.compact()
+        alive = [vertex for vertex, new_vertex in enumerate(mapping) if new_vertex != -1]
+        self._matrix = [[self._matrix[x][y] for y in alive] for x in alive]
+        return mapping
+
+    def set_edge(self, x, y, weight):
+        self._matrix[x][y] = weight
+
+    def set_edges(self, edges):
+        matrix = self._matrix
+        for x, y, weight in edges:
+            matrix[x][y] = weight
+
+    def remove_edge(self, x, y):
+        self._matrix[x][y] = 0
+
+    def weight(self, x, y):
+        return self._matrix[x][y]
+
+    def out_items(self, x):
+        return [(i, weight) for i, weight in enumerate(self._matrix[x]) if weight != 0]
+
+    def out_ids(self, x):
+        return [i for i, weight in enumerate(self._matrix[x]) if weight != 0]
+
+    def in_items(self, x):
+        return [(i, row[x]) for i, row in enumerate(self._matrix) if row[x] != 0]
+
+    def in_ids(self, x):
+        return [i for i, row in enumerate(self._matrix) if row[x] != 0]
+
+    def out_degree(self, x):
+        row = self._matrix[x]
+        return len(row) - row.count(0)
+
+    def in_degree(self, x):
+        return sum(1 for row in self._matrix if row[x] != 0)
+
+    def edges(self):
+        for i, row in enumerate(self._matrix):
+            for j, weight in enumerate(row):
+                if weight != 0:
+                    yield i, j, weight
+
+    def to_matrix(self):
+        bound = self.get_bound()
+        if bound == len(self._matrix):
+            return self._matrix
+        return [row[:bound] for row in self._matrix[:bound]]
+
+    def copy(self):
+        new_storage = MatrixStorage()
+        new_storage._vertices = self._vertices.copy()
+        new_storage._matrix = [row[:] for row in self._matrix]
+        return new_storage
+
+
+class AdjacencyListStorage(_Storage):
+    """Per-vertex outbound and inbound neighbour dicts, O(n + m) memory."""
+
+    name = "adjacency"
+
+    def __init__(self):
+        super().__init__()
+        self._out = []
+        self._in = []
+
+    def add_vertex(self):
+        vertex = self._vertices.add()
+        self._out.append({})
+        self._in.append({})
+        return vertex
+
+    def remove_vertex(self, vertex):
+        for y in self._out[vertex]:
+            del self._in[y][vertex]
+        for x in self._in[vertex]:
+            del self._out[x][vertex]
+        self._out[vertex] = {}
+        self._in[vertex] = {}
+        self._vertices.remove(vertex)
+
+    def compact(self):
+        mapping = self._vertices.compact()
+        self._out = self.__renumber(self._out, mapping)
+        self._in = self.__renumber(self._in, mapping)
+        return mapping
+
+    @staticmethod
+    def __renumber(rows, mapping):
+        return [{mapping[y]: weight for y, weight in neighbours.items()}
+                for vertex, neighbours in enumerate(rows) if mapping[vertex] != -1]
+
+    def set_edge(self, x, y, weight):
+        if weight == 0:
+            # A zero weight means "no edge", as in the matrix backend
+            self.remove_edge(x, y)
+            return
+        self._out[x][y] = weight
+        self._in[y][x] = weight
+
+    def set_edges(self, edges):
+        out_rows, in_rows = self._out, self._in
+        for x, y, weight in edges:
+            if weight == 0:
+                self.remove_edge(x, y)
+                continue
+            out_rows[x][y] = weight
+            in_rows[y][x] = weight
+
+    def remove_edge(self, x, y):
+        if self._out[x].pop(y, None) is not None:
+            del self._in[y][x]
+
+    def weight(self, x, y):
+        return self._out[x].get(y, 0)
+
+    def out_items(self, x):
+        return sorted(self._out[x].items())
+
+    def out_ids(self, x):
+        return sorted(self._out[x])
+
+    def in_items(self, x):
+        return sorted(self._in[x].items())
+
+    def in_ids(self, x):
+        return sorted(self._in[x])
+
+    def out_degree(self, x):
+        return len(self._out[x])
+
+    def in_degree(self, x):
+        return len(self._in[x])
+
+    def edges(self):
+        for x in self._vertices:
+            for y, weight in self.out_items(x):
+                yield x, y, weight
+
+    def to_matrix(self):
+        bound = self.get_bound()
+        matrix = [[0] * bound for _ in range(bound)]
+        for x, y, weight in self.edges():
+            matrix[x][y] = weight
+        return matrix
+
+    def copy(self):
+        new_storage = AdjacencyListStorage()
+        new_storage._vertices = self._vertices.copy()
+        new_storage._out = [dict(neighbours) for neighbours in self._out]
+        new_storage._in = [dict(neighbours) for neighbours in self._in]
+        return new_storage
+
+
+class CSRStorage(_Storage):
+    """Compressed sparse row arrays for read-heavy work.
+
+    Mutations go to an adjacency list which is packed into the offset, target and
+    weight arrays (plus their transposed counterparts) on the next whole graph read
+    (edges, the arrays, a copy). Per-vertex reads between edits use the adjacency list
+    directly, so interleaving them with edits does not repack the graph every time.
+    """
+
+    name = "csr"
+
+    def __init__(self):
+        super().__init__()
+        self._staging = self.__new_staging()
+        self._offsets = self._targets = self._weights = None
+        self._in_offsets = self._sources = self._in_weights = None
+        self._buffer = None
+
+    @staticmethod
+    def from_arrays(alive, out_arrays, in_arrays, buffer=None):
+        """Wrap packed (offsets, targets, weights) arrays, or memoryviews over buffer, without copying them."""
+        storage = CSRStorage()
+        storage._vertices = VertexTable.from_flags(alive)
+        storage._staging = None
+        storage._offsets, storage._targets, storage._weights = out_arrays
+        storage._in_offsets, storage._sources, storage._in_weights = in_arrays
+        storage._buffer = buffer
+        return storage
+
+    def __new_staging(self):
+        staging = AdjacencyListStorage()
+        staging._vertices = self._vertices
+        return staging
+
+    def _pack(self):
+        if self._staging is None:
+            return
+        self._offsets, self._targets, self._weights = self.__pack_rows(self._staging.out_items)
+        self._in_offsets, self._sources, self._in_weights = self.__pack_rows(self._staging.in_items)
+        self._staging = None
+
+    def __pack_rows(self, row_items):
+        offsets = array("q", [0])
+        targets = array("q")
+        weights = []
+        for x in range(self.get_bound()):
+            for y, weight in row_items(x):
+                targets.append(y)
+                weights.append(weight)
+            offsets.append(len(targets))
+        return offsets, targets, _weight_array(weights)
+
+    def _unpack(self):
+        if self._staging is not None:
+            return
+        staging = self.__new_staging()
+        staging._out = [{} for _ in range(self.get_bound())]
+        staging._in = [{} for _ in range(self.get_bound())]
+        for x, y, weight in self.edges():
+            staging.set_edge(x, y, weight)
+        self._staging = staging
+        self._offsets = self._targets = self._weights = None
+        self._in_offsets = self._sources = self._in_weights = None
+        self._buffer = None
+
+    def add_vertex(self):
+        if self._staging is None and self._buffer is None:
+            # A new vertex has no edges, so the packed rows only need one more offset
+            self._offsets.append(self._offsets[-1])
+            self._in_offsets.append(self._in_offsets[-1])
+            return self._vertices.add()
+        self._unpack()
+        return self._staging.add_vertex()
+
+    def remove_vertex(self, vertex):
+        self._unpack()
+        self._staging.remove_vertex(vertex)
+
+    def compact(self):
+        self._unpack()
+        return self._staging.compact()
+
+    def set_edge(self, x, y, weight):
+        self._unpack()
+        self._staging.set_edge(x, y, weight)
+
+    def set_edges(self, edges):
+        self._unpack()
+        self._staging.set_edges(edges)
+
+    def remove_edge(self, x, y):
+        self._unpack()
+        self._staging.remove_edge(x, y)
+
+    def weight(self, x, y):
+        if self._staging is not None:
+            return self._staging.weight(x, y)
+        start, end = self._offsets[x], self._offsets[x + 1]
+        index = bisect_left(self._targets, y, start, end)
+        if index < end and self._targets[index] == y:
+            return self._weights[index]
+        return 0
+
+    def out_items(self, x):
+        if self._staging is not None:
+            return self._staging.out_items(x)
+        start, end = self._offsets[x], self._offsets[x + 1]
+        return list(zip(self._targets[start:end], self._weights[start:end]))
+
+    def out_ids(self, x):
+        if self._staging is not None:
+            return self._staging.out_ids(x)
+        return self._targets[self._offsets[x]:self._offsets[x + 1]]
+
+    def in_items(self, x):
+        if self._staging is not None:
+            return self._staging.in_items(x)
+        start, end = self._in_offsets[x], self._in_offsets[x + 1]
+        return list(zip(self._sources[start:end], self._in_weights[start:end]))
+
+    def in_ids(self, x):
+        if self._staging is not None:
+            return self._staging.in_ids(x)
+        return self._sources[self._in_offsets[x]:self._in_offsets[x + 1]]
+
+    def out_degree(self, x):
+        if self._staging is not None:
+            return self._staging.out_degree(x)
+        return self._offsets[x + 1] - self._offsets[x]
+
+    def in_degree(self, x):
+        if self._staging is not None:
+            return self._staging.in_degree(x)
+        return self._in_offsets[x + 1] - self._in_offsets[x]
+
+    def edges(self):
+        self._pack()
+        for x in range(len(self._offsets) - 1):
+            for index in range(self._offsets[x], self._offsets[x + 1]):
+                yield x, self._targets[index], self._weights[index]
+
+    def get_arrays(self):
+        """Return the packed (offsets, targets, weights) arrays."""
+        self._pack()
+        return self._offsets, self._targets, self._weights
+
+    def get_in_arrays(self):
+        """Return the packed (offsets, sources, weights) arrays of the transposed graph."""
+        self._pack()
+        return self._in_offsets, self._sources, self._in_weights
+
+    def to_matrix(self):
+        bound = self.get_bound()
+        matrix = [[0] * bound for _ in range(bound)]
+        for x, y, weight in self.edges():
+            matrix[x][y] = weight
+        return matrix
+
+    def copy(self):
+        new_storage = CSRStorage()
+        if self._staging is not None:
+            new_storage._staging = self._staging.copy()
+            new_storage._vertices = new_storage._staging._vertices
+            return new_storage
+        new_storage._vertices = self._vertices.copy()
+        new_storage._staging = None
+        new_storage._offsets, new_storage._targets = array("q", self._offsets), array("q", self._targets)
+        new_storage._weights = _copy_weights(self._weights)
+        new_storage._in_offsets, new_storage._sources = array("q", self._in_offsets), array("q", self._sources)
+        new_storage._in_weights = _copy_weights(self._in_weights)
+        return new_storage
+
+
+class NumpyStorage(_Storage):
+    """Dense NumPy weight matrix for dense graphs.
+
+    Same layout as MatrixStorage (a 0 cell marks a missing edge, capacity doubling), but
+    rows, columns, degrees and the edge list are single array operations. The matrix is
+    int64 while every weight is an integer and float64 while every weight is fractional;
+    a mix of both (or integers beyond 64 bits) moves it to an object matrix that keeps
+    each weight's own type, at the cost of slower array operations. Needs NumPy.
+    """
+
+    name = "numpy"
+
+    def __init__(self):
+        if numpy is None:
+            raise ValueError("The numpy storage backend needs NumPy to be installed")
+        super().__init__()
+        self._matrix = numpy.zeros((0, 0), dtype=numpy.int64)
+
+    def add_vertex(self):
+        vertex = self._vertices.add()
+        if vertex == len(self._matrix):
+            self.__grow(max(1, 2 * len(self._matrix)))
+        return vertex
+
+    def __grow(self, capacity):
+        matrix = numpy.zeros((capacity, capacity), dtype=self._matrix.dtype)
+        size = len(self._matrix)
+        matrix[:size, :size] = self._matrix
+        self._matrix = matrix
+
+    @staticmethod
+    def __kind(weights):
+        """Return the dtype kind the weights need: "i" (int64), "f" (float64) or "O" (mixed)."""
+        kinds = set()
+        for weight in weights:
+            if isinstance(weight, (int, numpy.integer)) and not isinstance(weight, bool) and \
+                    -2 ** 63 <= weight < 2 ** 63:
+                kinds.add("i")
+            elif isinstance(weight, (float, numpy.floating)):
+                kinds.add("f")
+            else:
+                return "O"
+        return kinds.pop() if len(kinds) == 1 else "O" if kinds else "i"
+
+    def __fit(self, weights):
+        # Converting one kind into another would change the weights already stored
+        kind = self.__kind(weights)
+        current = self._matrix.dtype.kind
+        if kind == current or current == "O":
+            return
+        if self._matrix.any():
+            self._matrix = self._matrix.astype(object)
+        else:
+            dtype = {"i": numpy.int64, "f": numpy.float64}.get(kind, object)
+            self._matrix = numpy.zeros_like(self._matrix, dtype=dtype)
+
+    def remove_vertex(self, vertex):
+        self._matrix[vertex, :] = 0
+        self._matrix[:, vertex] = 0
+        self._vertices.remove(vertex)
+
+    def compact(self):
+        mapping = self._vertices.compact()
+        alive = numpy.flatnonzero(numpy.array(mapping) != -1)
+        self._matrix = self._matrix[numpy.ix_(alive, alive)]
+        return mapping
+
+    def set_edge(self, x, y, weight):
+        self.__fit((weight,))
+        self._matrix[x, y] = weight
+
+    def set_edges(self, edges):
+        sources, targets, weights = [], [], []
+        for x, y, weight in edges:
+            sources.append(x)
+            targets.append(y)
+            weights.append(weight)
+        if sources:
+            self.__fit(weights)
+            self._matrix[sources, targets] = numpy.array(weights, dtype=self._matrix.dtype)
+
+    def remove_edge(self, x, y):
+        self._matrix[x, y] = 0
+
+    def weight(self, x, y):
+        weight = self._matrix[x, y]
+        return weight.item() if isinstance(weight, numpy.generic) else weight
+
+    def out_items(self, x):
+        row = self._matrix[x, :self.get_bound()]
+        ids = numpy.flatnonzero(row)
+        return list(zip(ids.tolist(), row[ids].tolist()))
+
+    def out_ids(self, x):
+        return numpy.flatnonzero(self._matrix[x, :self.get_bound()]).tolist()
+
+    def in_items(self, x):
+        column = self._matrix[:self.get_bound(), x]
+        ids = numpy.flatnonzero(column)
+        return list(zip(ids.tolist(), column[ids].tolist()))
+
+    def in_ids(self, x):
+        return numpy.flatnonzero(self._matrix[:self.get_bound(), x]).tolist()
+
+    def out_degree(self, x):
+        return int(numpy.count_nonzero(self._matrix[x]))
+
+    def in_degree(self, x):
+        return int(numpy.count_nonzero(self._matrix[:, x]))
+
+    def degree_arrays(self):
+        present = self.get_array() != 0
+        return array("q", numpy.count_nonzero(present, axis=1).tolist()), \
+            array("q", numpy.count_nonzero(present, axis=0).tolist())
+
+    def edges(self):
+        matrix = self.get_array()
+        sources, targets = numpy.nonzero(matrix)
+        return zip(sources.tolist(), targets.tolist(), matrix[sources, targets].tolist())
+
+    def get_array(self):
+        """Return the bound x bound weight matrix as a NumPy view (not a copy)."""
+        bound = self.get_bound()
+        return self._matrix[:bound, :bound]
+
+    def to_matrix(self):
+        return self.get_array().tolist()
+
+    def copy(self):
+        new_storage = NumpyStorage()
+        new_storage._vertices = self._vertices.copy()
+        new_storage._matrix = self._matrix.copy()
+        return new_storage
+
+
+STORAGE_BACKENDS = {
+    MatrixStorage.name: MatrixStorage,
+    AdjacencyListStorage.name: AdjacencyListStorage,
+    CSRStorage.name: CSRStorage,
+    NumpyStorage.name: NumpyStorage,
+}
+
+
+def make_storage(storage):
+    """Return a storage instance from a backend name or an existing instance."""
+    if not isinstance(storage, str):
+        return storage
+    if storage not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {storage}")
+    return STORAGE_BACKENDS[storage]()
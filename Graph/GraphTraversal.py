@@ -0,0 +1,164 @@
+from GraphErrors import CycleError
+from GraphProfiler import PROFILER
+from collections import deque
+
+ENTER = 0
+EXIT = 1
+BACK_EDGE = 2
+
+_WHITE, _GRAY, _BLACK = 0, 1, 2
+
+
+def depth_first_events(graph, roots=None):
+    """Iterative depth-first search over the successor lists of graph.
+
+    Yields (event, vertex) pairs: ENTER when a vertex is discovered, EXIT once all of
+    its successors are finished and BACK_EDGE for a successor that is still on the
+    stack (i.e. a cycle). The search keeps an explicit stack of successor iterators,
+    so it runs in O(n + m) and is not bound by the recursion limit. Roots default to
+    every vertex in increasing order, successors are visited in increasing order.
+    """
+    state = bytearray(graph.get_vertex_bound())
+    visits = 0
+    try:
+        for root in graph.vertices() if roots is None else roots:
+            if state[root] != _WHITE:
+                continue
+            state[root] = _GRAY
+            visits += 1
+            yield ENTER, root
+            stack = [(root, iter(graph.successors(root)))]
+            while stack:
+                vertex, successors = stack[-1]
+                for successor in successors:
+                    if state[successor] == _WHITE:
+                        state[successor] = _GRAY
+                        visits += 1
+                        yield ENTER, successor
+                        stack.append((successor, iter(graph.successors(successor))))
+                        break
+                    if state[successor] == _GRAY:
+                        yield BACK_EDGE, successor
+                else:
+                    stack.pop()
+                    state[vertex] = _BLACK
+                    yield EXIT, vertex
+    finally:
+        # Also reached when the caller stops early and the generator is closed
+        if PROFILER.enabled:
+            PROFILER.count("dfs.visits", visits)
+
+
+def depth_first(graph, start, max_depth=None):
+    """Lazy depth-first preorder from start, yields (vertex, depth, parent) as vertices are found.
+
+    Successor lists are only fetched when a vertex is expanded, so a caller that stops
+    early pays only for what it consumed. The parent of start is None. With max_depth,
+    vertices at that depth are not expanded; depths are measured along the search tree.
+    """
+    visited = bytearray(graph.get_vertex_bound())
+    visited[start] = 1
+    yield start, 0, None
+    stack = [(start, 0, iter(graph.successors(start)))] if max_depth != 0 else []
+    while stack:
+        vertex, depth, successors = stack[-1]
+        for successor in successors:
+            if not visited[successor]:
+                visited[successor] = 1
+                yield successor, depth + 1, vertex
+                if max_depth is None or depth + 1 < max_depth:
+                    stack.append((successor, depth + 1, iter(graph.successors(successor))))
+                break
+        else:
+            stack.pop()
+
+
+def breadth_first(graph, start, max_depth=None):
+    """Lazy breadth-first order from start, yields (vertex, depth, parent) with depth the edge distance.
+
+    With max_depth only the vertices at most max_depth edges away are visited.
+    """
+    visited = bytearray(graph.get_vertex_bound())
+    visited[start] = 1
+    yield start, 0, None
+    queue = deque([(start, 0)])
+    while queue:
+        vertex, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for successor in graph.successors(vertex):
+            if not visited[successor]:
+                visited[successor] = 1
+                yield successor, depth + 1, vertex
+                queue.append((successor, depth + 1))
+
+
+def has_cycle(graph):
+    return any(event == BACK_EDGE for event, _ in depth_first_events(graph))
+
+
+def postorder(graph, roots=None):
+    """Return the vertices in the order their depth-first search finishes."""
+    return [vertex for event, vertex in depth_first_events(graph, roots) if event == EXIT]
+
+
+def reachable(graph, start):
+    """Return a flag per vertex id telling whether it can be reached from start."""
+    visited = bytearray(graph.get_vertex_bound())
+    visited[start] = 1
+    stack = [start]
+    while stack:
+        for successor in graph.successors(stack.pop()):
+            if not visited[successor]:
+                visited[successor] = 1
+                stack.append(successor)
+    return visited
+
+
+def kahn_layers(graph):
+    """Kahn's algorithm: return the vertices grouped in topological layers.
+
+    Every vertex of a layer only has predecessors in earlier layers, so a layer can be
+    processed in parallel. If some vertices are never freed the graph has a cycle and a
+    CycleError carrying one of them is raised, all in a single O(n + m) pass.
+    """
+    in_degree = [0] * graph.get_vertex_bound()
+    for vertex in graph.vertices():
+        for successor in graph.successors(vertex):
+            in_degree[successor] += 1
+
+    layers = []
+    layer = [vertex for vertex in graph.vertices() if in_degree[vertex] == 0]
+    placed = 0
+    while layer:
+        layers.append(layer)
+        placed += len(layer)
+        next_layer = []
+        for vertex in layer:
+            for successor in graph.successors(vertex):
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    next_layer.append(successor)
+        next_layer.sort()
+        layer = next_layer
+
+    if placed < graph.get_n():
+        raise CycleError(_find_cycle(graph, in_degree))
+    return layers
+
+
+def _find_cycle(graph, in_degree):
+    """Walk backwards through the vertices Kahn's algorithm could not place until one repeats."""
+    vertex = next(vertex for vertex in graph.vertices() if in_degree[vertex] > 0)
+    position = {}
+    walk = []
+    while vertex not in position:
+        position[vertex] = len(walk)
+        walk.append(vertex)
+        # Each stuck vertex still has a stuck predecessor, otherwise it would have been placed
+        vertex = next(predecessor for predecessor in graph.predecessors(vertex) if in_degree[predecessor] > 0)
+    cycle = walk[position[vertex]:]
+    cycle.reverse()
+    # Start the report at the smallest vertex so it does not depend on where the walk began
+    first = cycle.index(min(cycle))
+    return cycle[first:] + cycle[:first]
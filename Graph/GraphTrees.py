@@ -0,0 +1,60 @@
+from array import array
+
+
+def tree_from_traversals(inorder, preorder):
+    """Rebuild a binary tree from its inorder and preorder traversals in O(n), without recursion.
+
+    Node i is the i-th value of preorder. Returns the (left, right) arrays of child node
+    indexes, -1 for a missing child. Neither input list is modified.
+    """
+    if len(inorder) != len(preorder):
+        raise ValueError("The inorder and preorder traversals must have the same length")
+    position = {value: index for index, value in enumerate(inorder)}
+    if len(position) != len(inorder):
+        raise ValueError("The tree values must be distinct")
+
+    left = array("q", [-1]) * len(preorder)
+    right = array("q", [-1]) * len(preorder)
+    # The stack holds the path of nodes whose right subtree has not been started yet
+    stack = []
+    for node, value in enumerate(preorder):
+        if value not in position:
+            raise ValueError(f"{value} is in the preorder but not in the inorder traversal")
+        if stack and position[value] < position[preorder[stack[-1]]]:
+            left[stack[-1]] = node
+        else:
+            parent = -1
+            while stack and position[value] > position[preorder[stack[-1]]]:
+                parent = stack.pop()
+            if parent != -1:
+                right[parent] = node
+        stack.append(node)
+
+    if [preorder[node] for node in inorder_nodes(left, right)] != list(inorder):
+        raise ValueError("The traversals do not describe the same binary tree")
+    return left, right
+
+
+def inorder_nodes(left, right, root=0):
+    """Yield the node indexes of an array tree in inorder, iteratively."""
+    stack = []
+    node = root if len(left) else -1
+    while stack or node != -1:
+        while node != -1:
+            stack.append(node)
+            node = left[node]
+        node = stack.pop()
+        yield node
+        node = right[node]
+
+
+def preorder_walk(root):
+    """Yield (node, depth, parent, is_left) for every node below root in preorder, iteratively."""
+    stack = [(root, 0, None, False)]
+    while stack:
+        node, depth, parent, is_left = stack.pop()
+        yield node, depth, parent, is_left
+        if node.right:
+            stack.append((node.right, depth + 1, node, False))
+        if node.left:
+            stack.append((node.left, depth + 1, node, True))
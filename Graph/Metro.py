@@ -1,14 +1,82 @@
+from ContractionHierarchy import ContractionHierarchy
 from Graph import Graph
+from GraphCache import cached_query
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from GraphProfiler import PROFILER
+import GraphBinary
+import MetroRouting
 import heapq
+import os
+import tempfile
+
+TRANSFER_PENALTY = 3
+TRANSFER_MODELS = ("clique", "implicit")
+ROUTING_METHODS = ("dijkstra", "bidirectional", "astar", "hierarchy")
+
+_worker_metro = None
+
+
+def _init_tree_worker(file_name):
+    # Every worker maps the same snapshot instead of receiving a pickled copy of the network
+    global _worker_metro
+    _worker_metro = Metro.load_binary(file_name)
+
+
+def _tree_worker(station):
+    return _worker_metro.shortest_path_tree(station)
+
+
+class Route:
+    """A journey found by Metro.shortest_path.
+
+    stations lists the stations visited in order, lines the metro lines ridden in order
+    and transfers the (station, from_line, to_line) changes made on the way.
+    """
+
+    def __init__(self, distance, stations, lines, transfers):
+        self.distance = distance
+        self.stations = stations
+        self.lines = lines
+        self.transfers = transfers
+
+    def __eq__(self, other):
+        return isinstance(other, Route) and (self.distance, self.stations, self.lines, self.transfers) == \
+            (other.distance, other.stations, other.lines, other.transfers)
+
+    def __repr__(self):
+        return f"Route(distance={self.distance}, stations={self.stations}, lines={self.lines}, " \
+               f"transfers={self.transfers})"
 
 
 class Metro(Graph):
-    def __init__(self, reversible: bool = True, weighted: bool = True):
-        super().__init__(reversible, weighted)
+    """Metro network with one node per (line, station) visit.
+
+    transfers chooses how changing lines inside a station is modelled: "clique" stores a
+    transfer edge between every pair of nodes of the station, "implicit" stores none and
+    neighbours() adds the transfers of a node on the fly. Both give the same routes; the
+    implicit model saves the k(k - 1) / 2 edges of a station served k times.
+    """
+
+    def __init__(self, reversible: bool = True, weighted: bool = True, storage="adjacency",
+                 transfers: str = "clique"):
+        super().__init__(reversible, weighted, storage)
+        if transfers not in TRANSFER_MODELS:
+            raise ValueError(f"Unknown transfer model: {transfers}")
+        if transfers == "implicit" and not reversible:
+            # Directed clique transfers only lead from a station's older nodes to its newer ones
+            raise ValueError("The implicit transfer model needs a reversible metro")
 
         self.__created_nodes = 0
         self.__station_nodes = dict()
         self.__node_to_station = dict()
+        self.__node_to_line = dict()
+        self.__station_points = None
+        self.__landmark_count = 0
+        self.__hierarchy = None
+        self.__transfers = transfers
+        self.__transfer_penalties = dict()
+        self.__closed_lines = set()
 
     def create_metro_from_file(self, file_name: str = None) -> None:
         if file_name is None:
@@ -18,70 +86,424 @@ class Metro(Graph):
             input_lines = fin.readlines()
 
             for line_info in input_lines:
-                stations = line_info.strip().split(',')[1:]
-                last_station_node = -1
+                line_name, *stations = line_info.strip().split(',')
+                line_stations = []
 
                 for station_info in stations:
                     curr_station, weight = station_info.strip()[1:-1].split(';')
-                    weight = int(weight)
+                    line_stations.append((curr_station, int(weight)))
 
-                    if curr_station not in self.__station_nodes:
-                        self.__station_nodes[curr_station] = []
+                self.add_line(line_name, line_stations)
 
-                    self.__station_nodes[curr_station].append(self.__created_nodes)
-                    self.__node_to_station[self.__created_nodes] = curr_station
+    def add_line(self, line_name, stations):
+        """Add a line through stations, given as (station, travel time from the previous one) pairs.
 
-                    self.__created_nodes += 1
-                    self.add_vertex()
+        Every visit gets its own node; with the clique transfer model it is linked to the
+        other nodes of its station. All edges go in through one bulk insertion.
+        """
+        sources, targets, weights = array("q"), array("q"), []
+        last_station_node = -1
 
-                    if last_station_node != -1:
-                        self.add_edge(last_station_node, self.__created_nodes - 1, weight)
+        for curr_station, weight in stations:
+            node = self.add_vertex()
+            if curr_station not in self.__station_nodes:
+                self.__station_nodes[curr_station] = []
 
-                    last_station_node = self.__created_nodes - 1
+            if self.__transfers == "clique":
+                for other_node in self.__station_nodes[curr_station]:
+                    sources.append(other_node)
+                    targets.append(node)
+                    weights.append(self.get_transfer_penalty(curr_station))
 
-        for station in self.__station_nodes:
-            for from_vertex in self.__station_nodes[station]:
-                for to_vertex in self.__station_nodes[station]:
-                    if from_vertex < to_vertex:
-                        self.add_edge(from_vertex, to_vertex, 3)
+            self.__station_nodes[curr_station].append(node)
+            self.__node_to_station[node] = curr_station
+            self.__node_to_line[node] = line_name
+            self.__created_nodes = node + 1
 
-    def dijkstra(self, start_station: str = None):
-        if start_station is None:
-            raise ValueError("Starting station was not provided!")
+            if last_station_node != -1:
+                sources.append(last_station_node)
+                targets.append(node)
+                weights.append(weight)
+
+            last_station_node = node
+
+        self.add_edge_arrays(sources, targets, weights)
+        if self.__transfers == "implicit":
+            # The new nodes have transfers to the stations' existing nodes that no edge records
+            self._changed()
+
+    def save_binary(self, file_name):
+        """Save the network together with its station <-> node maps."""
+        super().save_binary(file_name, {"station_nodes": self.__station_nodes,
+                                        "node_lines": [[node, line] for node, line in self.__node_to_line.items()],
+                                        "transfers": self.__transfers,
+                                        "transfer_penalties": self.__transfer_penalties,
+                                        "closed_lines": sorted(self.__closed_lines)})
+
+    @staticmethod
+    def load_binary(file_name):
+        storage, reversible, weighted, metadata = GraphBinary.load_binary(file_name)
+        if metadata is None or "station_nodes" not in metadata:
+            raise ValueError(f"{file_name} does not contain a metro network")
+        metro = Metro(reversible, weighted, storage, metadata.get("transfers", "clique"))
+        metro.__transfer_penalties = metadata.get("transfer_penalties", {})
+        metro.__closed_lines = set(metadata.get("closed_lines", []))
+        metro.__station_nodes = metadata["station_nodes"]
+        metro.__node_to_station = {node: station for station, nodes in metro.__station_nodes.items()
+                                   for node in nodes}
+        metro.__node_to_line = {node: line for node, line in metadata.get("node_lines", [])}
+        metro.__created_nodes = metro.get_vertex_bound()
+        return metro
+
+    def compact(self):
+        mapping = super().compact()
+        self.__station_nodes = {station: [mapping[node] for node in nodes if mapping[node] != -1]
+                                for station, nodes in self.__station_nodes.items()}
+        self.__node_to_station = {mapping[node]: station for node, station in self.__node_to_station.items()
+                                  if mapping[node] != -1}
+        self.__node_to_line = {mapping[node]: line for node, line in self.__node_to_line.items()
+                               if mapping[node] != -1}
+        self.__created_nodes = self.get_vertex_bound()
+        return mapping
+
+    def freeze(self):
+        """Return an immutable snapshot of the network, see Graph.freeze; routing works on it."""
+        frozen = super().freeze()
+        if frozen is not self:
+            frozen.__copy_maps()
+        return frozen
+
+    def thaw(self):
+        thawed = super().thaw()
+        thawed.__copy_maps()
+        return thawed
+
+    def __copy_maps(self):
+        # A snapshot and its thawed copies must not share the station maps they may change
+        self.__station_nodes = {station: list(nodes) for station, nodes in self.__station_nodes.items()}
+        self.__node_to_station = dict(self.__node_to_station)
+        self.__node_to_line = dict(self.__node_to_line)
+        self.__transfer_penalties = dict(self.__transfer_penalties)
+        self.__closed_lines = set(self.__closed_lines)
+
+    def get_stations(self):
+        return list(self.__station_nodes)
+
+    def get_station_nodes(self, station):
+        return list(self.__station_nodes[station])
+
+    def get_node_station(self, node):
+        return self.__node_to_station[node]
+
+    def get_node_line(self, node):
+        return self.__node_to_line.get(node)
+
+    def get_transfer_model(self):
+        return self.__transfers
+
+    def get_transfer_penalty(self, station):
+        return self.__transfer_penalties.get(station, TRANSFER_PENALTY)
+
+    def set_transfer_penalty(self, station, penalty):
+        """Change the time needed to change lines at station.
+
+        Returns the changed transfers as (node1, node2, old_weight, new_weight) tuples.
+        """
+        if station not in self.__station_nodes:
+            raise ValueError(f"Station {station} does not exist in the metro system.")
+        if penalty <= 0:
+            # The clique model stores transfers as edges, which a 0 weight would delete
+            raise ValueError("A transfer must take a positive time")
+        changes = [(node1, node2, weight, penalty) for node1 in self.__station_nodes[station]
+                   for node2, weight in self.__transfers_of(node1) if node1 < node2]
+        self._changed()
+        self.__transfer_penalties[station] = penalty
+        if self.__transfers == "clique":
+            for node1, node2, _, _ in changes:
+                self.add_edge(node1, node2, penalty)
+        return changes
+
+    def __transfers_of(self, node):
+        """Return the (node, penalty) transfers from node to the other nodes of its station."""
+        if self.__transfers == "clique":
+            station = self.__node_to_station[node]
+            return [(neighbor, weight) for neighbor, weight in super().neighbours(node)
+                    if self.__node_to_station[neighbor] == station]
+        if self.__node_to_line.get(node) in self.__closed_lines:
+            return []
+        station = self.__node_to_station[node]
+        penalty = self.get_transfer_penalty(station)
+        return [(other, penalty) for other in self.__station_nodes[station]
+                if other != node and self.__node_to_line.get(other) not in self.__closed_lines]
+
+    def neighbours(self, x):
+        """Return the (neighbour, weight) pairs reachable from x, implicit transfers included."""
+        if self.__transfers == "clique":
+            return super().neighbours(x)
+        return sorted(super().neighbours(x) + self.__transfers_of(x))
 
-        if start_station not in self.__station_nodes:
-            raise ValueError("Start station does not exist in the metro system.")
+    def reverse_neighbours(self, x):
+        if self.__transfers == "clique":
+            return super().reverse_neighbours(x)
+        return sorted(super().reverse_neighbours(x) + self.__transfers_of(x))
 
-        # Get the total number of nodes created
-        num_nodes = self.__created_nodes
+    def successors(self, x):
+        if self.__transfers == "clique":
+            return super().successors(x)
+        return [neighbor for neighbor, _ in self.neighbours(x)]
+
+    def predecessors(self, x):
+        if self.__transfers == "clique":
+            return super().predecessors(x)
+        return [neighbor for neighbor, _ in self.reverse_neighbours(x)]
+
+    def _implicit_edges(self):
+        if self.__transfers == "clique":
+            return
+        # Chaining the open nodes of every station connects them as well as all their transfers
+        for nodes in self.__station_nodes.values():
+            open_nodes = [node for node in nodes if self.__node_to_line.get(node) not in self.__closed_lines]
+            yield from zip(open_nodes, open_nodes[1:])
+
+    def set_segment_weight(self, from_station, to_station, weight, line=None):
+        """Change the travel time between two stations (on one line only if given).
+
+        Returns the changed edges as (node1, node2, old_weight, new_weight) tuples.
+        """
+        self.__check_station(from_station, "Starting")
+        self.__check_station(to_station, "Destination")
+        if weight <= 0:
+            # A 0 weight would delete the segment and a negative one would make Dijkstra loop forever
+            raise ValueError("A segment must take a positive time, use close_line to remove a line")
+        changes = []
+        for node1 in self.__station_nodes[from_station]:
+            if line is not None and self.__node_to_line.get(node1) != line:
+                continue
+            for node2, old_weight in self.neighbours(node1):
+                if self.__node_to_station[node2] == to_station and \
+                        (line is None or self.__node_to_line.get(node2) == line):
+                    changes.append((node1, node2, old_weight, weight))
+        if not changes:
+            raise ValueError(f"There is no segment between {from_station} and {to_station}")
+        for node1, node2, _, _ in changes:
+            self.add_edge(node1, node2, weight)
+        return changes
+
+    def close_line(self, line):
+        """Remove every edge of a line, transfers included; returns them as (node1, node2, old_weight, 0)."""
+        changes = []
+        for node, node_line in self.__node_to_line.items():
+            if node_line != line:
+                continue
+            for neighbor, old_weight in self.neighbours(node):
+                # An undirected edge inside the line would otherwise be listed from both ends
+                if self.is_reversible() and neighbor < node and self.__node_to_line.get(neighbor) == line:
+                    continue
+                changes.append((node, neighbor, old_weight, 0))
+        if not changes:
+            raise ValueError(f"Line {line} does not exist or is already closed")
+        for node1, node2, _, _ in changes:
+            # Implicit transfers have no edge to remove, closing the line drops them
+            if self.is_edge(node1, node2):
+                self.remove_edge(node1, node2)
+        if self.__transfers == "implicit":
+            self._changed()
+            self.__closed_lines.add(line)
+        return changes
+
+    def __check_station(self, station, role):
+        if station is None:
+            raise ValueError(f"{role} station was not provided!")
+        if station not in self.__station_nodes:
+            raise ValueError(f"{role} station does not exist in the metro system.")
+
+    def _search(self, start_station, end_station=None):
+        """Dijkstra from every node of start_station over the real neighbours of each node.
+
+        With an end_station the search stops as soon as one of its nodes is settled and
+        that node is returned with the distance and predecessor arrays.
+        """
+        num_nodes = self.get_vertex_bound()
         min_dist = [float('inf')] * num_nodes
         prev_node = [-1] * num_nodes
         pq = []
+        targets = set(self.__station_nodes[end_station]) if end_station is not None else ()
+
+        pushes = pops = 0
 
         # Enqueue all nodes corresponding to the start station
-        start_nodes = self.__station_nodes[start_station]
-        for node in start_nodes:
+        for node in self.__station_nodes[start_station]:
             min_dist[node] = 0
             heapq.heappush(pq, (0, node))
+            pushes += 1
 
+        end_node = -1
         while pq:
             current_dist, current_node = heapq.heappop(pq)
+            pops += 1
 
             if current_dist > min_dist[current_node]:
                 continue
+            if current_node in targets:
+                end_node = current_node
+                break
+
+            for neighbor, edge_weight in self.neighbours(current_node):
+                if min_dist[neighbor] > current_dist + edge_weight:
+                    min_dist[neighbor] = current_dist + edge_weight
+                    prev_node[neighbor] = current_node
+                    heapq.heappush(pq, (min_dist[neighbor], neighbor))
+                    pushes += 1
+
+        if PROFILER.enabled:
+            PROFILER.count("metro.searches")
+            PROFILER.count("metro.heap_pushes", pushes)
+            PROFILER.count("metro.heap_pops", pops)
+        return end_node, min_dist, prev_node
 
-            # Traverse all neighboring nodes
-            for neighbor in range(num_nodes):
-                if self._graph[current_node][neighbor] != 0:  # There's a direct path
-                    edge_weight = self._graph[current_node][neighbor]
-                    if min_dist[neighbor] > current_dist + edge_weight:
-                        min_dist[neighbor] = current_dist + edge_weight
-                        prev_node[neighbor] = current_node
-                        heapq.heappush(pq, (min_dist[neighbor], neighbor))
+    def shortest_path_tree(self, start_station):
+        """Return the (distance, predecessor) arrays over all nodes of a Dijkstra from start_station."""
+        self.__check_station(start_station, "Starting")
+        _, min_dist, prev_node = self._search(start_station)
+        return array("d", min_dist), array("q", prev_node)
+
+    def shortest_path_trees(self, sources=None, workers: int = 1):
+        """Return the shortest path tree of every source station (all stations by default).
+
+        The result maps each station to the arrays of shortest_path_tree. With several
+        workers the network is written once to a binary snapshot that every process of
+        the pool maps into memory, so only station names and result arrays are pickled.
+        """
+        sources = self.get_stations() if sources is None else list(sources)
+        for station in sources:
+            self.__check_station(station, "Starting")
+        if workers <= 1 or len(sources) <= 1:
+            return {station: self.shortest_path_tree(station) for station in sources}
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "metro.bin")
+            self.save_binary(file_name)
+            chunk_size = max(1, len(sources) // (4 * workers))
+            with ProcessPoolExecutor(workers, initializer=_init_tree_worker, initargs=(file_name,)) as pool:
+                trees = list(pool.map(_tree_worker, sources, chunksize=chunk_size))
+        return dict(zip(sources, trees))
+
+    def dijkstra(self, start_station: str = None):
+        self.__check_station(start_station, "Starting")
+        with PROFILER.timer("metro.dijkstra"):
+            _, min_dist, prev_node = self._search(start_station)
 
         # Printing or returning the paths and distances
         self.print_paths(start_station, min_dist, prev_node)
 
+    def shortest_path(self, start_station: str = None, end_station: str = None, method: str = "dijkstra"):
+        """Return the fastest Route between two stations, or None if they are not connected.
+
+        method is "dijkstra", "bidirectional" (searching from both ends at once) or "astar"
+        (guided by the landmarks of prepare_landmarks or else the station coordinates) or
+        "hierarchy" (over the contraction hierarchy of prepare_hierarchy).
+        Nothing is printed and the search stops once the destination is reached.
+        """
+        self.__check_station(start_station, "Starting")
+        self.__check_station(end_station, "Destination")
+        with PROFILER.timer(f"metro.shortest_path.{method}"):
+            return self.__route(start_station, end_station, method)
+
+    def __route(self, start_station, end_station, method):
+        start_nodes, end_nodes = self.__station_nodes[start_station], self.__station_nodes[end_station]
+
+        if method == "dijkstra":
+            end_node, min_dist, prev_node = self._search(start_station, end_station)
+            if end_node == -1:
+                return None
+            return self._build_route(min_dist[end_node], self._node_path(end_node, prev_node))
+        if method == "bidirectional":
+            distance, node_path = MetroRouting.bidirectional_dijkstra(self, start_nodes, end_nodes)
+        elif method == "astar":
+            distance, node_path = MetroRouting.astar(self, start_nodes, end_nodes, self.__heuristic(end_station))
+        elif method == "hierarchy":
+            distance, node_path = self.get_hierarchy().query(start_nodes, end_nodes)
+        else:
+            raise ValueError(f"Unknown routing method: {method}")
+        return self._build_route(distance, node_path) if node_path else None
+
+    def prepare_hierarchy(self, hierarchy=None):
+        """Build the contraction hierarchy used by shortest_path(method="hierarchy").
+
+        A hierarchy loaded with ContractionHierarchy.load can be given instead; it must have
+        been built for this network. Any change to the network makes it stale.
+        """
+        if hierarchy is None:
+            hierarchy = ContractionHierarchy.build(self)
+        elif hierarchy.get_n() != self.get_vertex_bound():
+            raise ValueError("The contraction hierarchy was built for a different metro network")
+        self.__hierarchy = (self.get_version(), hierarchy)
+        return hierarchy
+
+    def get_hierarchy(self):
+        if self.__hierarchy is None:
+            raise ValueError("No contraction hierarchy, see prepare_hierarchy")
+        version, hierarchy = self.__hierarchy
+        if version != self.get_version():
+            raise ValueError("The metro changed since the contraction hierarchy was built")
+        return hierarchy
+
+    def set_station_coordinates(self, coordinates):
+        """Give every station an (x, y) position, used as an A* lower bound on travel time."""
+        missing = [station for station in self.__station_nodes if station not in coordinates]
+        if missing:
+            raise ValueError(f"No coordinates for station {missing[0]}")
+        self.__station_points = {node: tuple(coordinates[station]) for node, station in self.__node_to_station.items()}
+        self._query_cache.clear()
+
+    def prepare_landmarks(self, count: int = 4):
+        """Precompute distances from count landmark nodes for the ALT heuristic of A*."""
+        self.__landmark_count = count
+        self._landmarks(count)
+
+    @cached_query()
+    def _landmarks(self, count):
+        return MetroRouting.select_landmarks(self, count)
+
+    @cached_query()
+    def _coordinate_factor(self):
+        return MetroRouting.coordinate_factor(self, self.__station_points)
+
+    def __heuristic(self, end_station):
+        end_nodes = self.__station_nodes[end_station]
+        if self.__landmark_count:
+            return MetroRouting.landmark_heuristic(self._landmarks(self.__landmark_count), end_nodes,
+                                                   self.is_reversible())
+        if self.__station_points is not None:
+            return MetroRouting.coordinate_heuristic(self._coordinate_factor(), self.__station_points,
+                                                     self.__station_points[end_nodes[0]])
+        raise ValueError("A* needs station coordinates or landmarks, see set_station_coordinates/prepare_landmarks")
+
+    @staticmethod
+    def _node_path(end_node, prev_node):
+        path = []
+        current_node = end_node
+        while current_node != -1:
+            path.append(current_node)
+            current_node = prev_node[current_node]
+        path.reverse()
+        return path
+
+    def _build_route(self, distance, node_path):
+        stations, lines, transfers = [], [], []
+        for index, node in enumerate(node_path):
+            station = self.__node_to_station[node]
+            line = self.__node_to_line.get(node)
+            if not stations or stations[-1] != station:
+                stations.append(station)
+            if not lines:
+                lines.append(line)
+            elif index > 0 and self.__node_to_station[node_path[index - 1]] == station:
+                # Two consecutive nodes of the same station mean a transfer edge was taken
+                transfers.append((station, lines[-1], line))
+                lines.append(line)
+        return Route(distance, stations, lines, transfers)
+
     def print_paths(self, start_station, min_dist, prev_node):
         for end_station in self.__station_nodes:
             if start_station == end_station:
@@ -100,25 +522,13 @@ class Metro(Graph):
                 print(f"There is no path between {start_station} and {end_station}")
                 continue
 
-            # Construct the path
-            path = []
-            current_node = best_node
-            while current_node != -1:
-                current_station = self.__node_to_station[current_node]
-                if not path or path[-1] != current_station:
-                    path.append(current_station)
-                current_node = prev_node[current_node]
-
-            path.reverse()
+            path = self._build_route(best_distance, self._node_path(best_node, prev_node)).stations
 
             print(f"Distance from {start_station} to {end_station}: {best_distance} minutes")
             print(f"Path: {', '.join(path)}\n")
 
     def __str__(self):
         graph_str = "Metro Network:\n"
-        nodes = self.get_n()
-        for i in range(nodes):
-            for j in range(nodes):
-                if self._graph[i][j] != 0:
-                    graph_str += f"Station {i} -> Station {j} with travel time: {self._graph[i][j]} minutes\n"
+        for i, j, weight in self._storage.edges():
+            graph_str += f"Station {i} -> Station {j} with travel time: {weight} minutes\n"
         return graph_str
@@ -0,0 +1,172 @@
+import heapq
+import math
+
+INF = float('inf')
+
+
+def node_distances(graph, sources):
+    """Plain Dijkstra from a set of source nodes, returns the distance to every node id."""
+    min_dist = [INF] * graph.get_vertex_bound()
+    pq = []
+    for node in sources:
+        min_dist[node] = 0
+        pq.append((0, node))
+    heapq.heapify(pq)
+    while pq:
+        current_dist, current_node = heapq.heappop(pq)
+        if current_dist > min_dist[current_node]:
+            continue
+        for neighbor, edge_weight in graph.neighbours(current_node):
+            if min_dist[neighbor] > current_dist + edge_weight:
+                min_dist[neighbor] = current_dist + edge_weight
+                heapq.heappush(pq, (min_dist[neighbor], neighbor))
+    return min_dist
+
+
+def _unwind(node, prev_node):
+    path = []
+    while node != -1:
+        path.append(node)
+        node = prev_node[node]
+    return path
+
+
+def bidirectional_dijkstra(graph, sources, targets):
+    """Dijkstra from the sources and, over reversed edges, from the targets at the same time.
+
+    The side with the smaller queue head is expanded next and the search stops once the
+    two heads together cannot beat the best meeting found. Returns (distance, node path),
+    (inf, []) when the targets cannot be reached.
+    """
+    num_nodes = graph.get_vertex_bound()
+    dist = ([INF] * num_nodes, [INF] * num_nodes)
+    prev = ([-1] * num_nodes, [-1] * num_nodes)
+    queues = ([], [])
+    expand = (graph.neighbours, graph.reverse_neighbours)
+    for side, nodes in enumerate((sources, targets)):
+        for node in nodes:
+            dist[side][node] = 0
+            queues[side].append((0, node))
+
+    best, meeting = INF, -1
+    for node in targets:
+        if dist[0][node] == 0:
+            best, meeting = 0, node
+
+    while queues[0] or queues[1]:
+        heads = [queue[0][0] if queue else INF for queue in queues]
+        if heads[0] + heads[1] >= best:
+            break
+        side = 0 if heads[0] <= heads[1] else 1
+        other = 1 - side
+        current_dist, current_node = heapq.heappop(queues[side])
+        if current_dist > dist[side][current_node]:
+            continue
+        for neighbor, edge_weight in expand[side](current_node):
+            new_dist = current_dist + edge_weight
+            if new_dist < dist[side][neighbor]:
+                dist[side][neighbor] = new_dist
+                prev[side][neighbor] = current_node
+                heapq.heappush(queues[side], (new_dist, neighbor))
+            if dist[side][neighbor] + dist[other][neighbor] < best:
+                best, meeting = dist[side][neighbor] + dist[other][neighbor], neighbor
+
+    if meeting == -1:
+        return INF, []
+    path = _unwind(meeting, prev[0])
+    path.reverse()
+    path.extend(_unwind(prev[1][meeting], prev[1]))
+    return best, path
+
+
+def astar(graph, sources, targets, heuristic):
+    """A* search, heuristic(node) must be a consistent lower bound on the distance to the targets.
+
+    Returns (distance, node path), (inf, []) when the targets cannot be reached.
+    """
+    num_nodes = graph.get_vertex_bound()
+    min_dist = [INF] * num_nodes
+    prev_node = [-1] * num_nodes
+    targets = set(targets)
+    pq = []
+    for node in sources:
+        min_dist[node] = 0
+        heapq.heappush(pq, (heuristic(node), 0, node))
+
+    while pq:
+        _, current_dist, current_node = heapq.heappop(pq)
+        if current_dist > min_dist[current_node]:
+            continue
+        if current_node in targets:
+            path = _unwind(current_node, prev_node)
+            path.reverse()
+            return current_dist, path
+        for neighbor, edge_weight in graph.neighbours(current_node):
+            new_dist = current_dist + edge_weight
+            if min_dist[neighbor] > new_dist:
+                min_dist[neighbor] = new_dist
+                prev_node[neighbor] = current_node
+                heapq.heappush(pq, (new_dist + heuristic(neighbor), new_dist, neighbor))
+
+    return INF, []
+
+
+def coordinate_factor(graph, node_points):
+    """Return the smallest travel time per unit of straight-line distance over all edges.
+
+    Scaling the straight-line distance by it never overestimates a travel time.
+    """
+    factor = INF
+    for x in graph.vertices():
+        for y, weight in graph.neighbours(x):
+            length = math.dist(node_points[x], node_points[y])
+            if length > 0:
+                factor = min(factor, weight / length)
+    return 0 if factor == INF else factor
+
+
+def coordinate_heuristic(factor, node_points, target_point):
+    return lambda node: factor * math.dist(node_points[node], target_point)
+
+
+def select_landmarks(graph, count):
+    """Pick count landmarks by farthest-point selection and return their distance arrays."""
+    nodes = list(graph.vertices())
+    if not nodes:
+        return []
+    landmark = nodes[0]
+    distances = []
+    closest = [INF] * graph.get_vertex_bound()
+    for _ in range(min(count, len(nodes))):
+        landmark_dist = node_distances(graph, [landmark])
+        distances.append(landmark_dist)
+        for node in nodes:
+            closest[node] = min(closest[node], landmark_dist[node])
+        reachable = [node for node in nodes if closest[node] != INF]
+        landmark = max(reachable, key=closest.__getitem__)
+        if closest[landmark] == 0:
+            break
+    return distances
+
+
+def landmark_heuristic(landmarks, targets, symmetric):
+    """ALT lower bound from the triangle inequality: d(n, t) >= d(L, t) - d(L, n) for every landmark L.
+
+    On undirected graphs d(L, n) - d(L, t) is a lower bound too.
+    """
+    targets = list(targets)
+
+    def heuristic(node):
+        best = INF
+        for target in targets:
+            bound = 0
+            for landmark_dist in landmarks:
+                to_target, to_node = landmark_dist[target], landmark_dist[node]
+                if to_target == INF or to_node == INF:
+                    continue
+                difference = to_target - to_node
+                bound = max(bound, abs(difference) if symmetric else difference)
+            best = min(best, bound)
+        return best
+
+    return heuristic
@@ -0,0 +1,225 @@
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from Metro import Metro, ROUTING_METHODS
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+DEFAULT_CACHE_SIZE = 4096
+LATENCY_WINDOW = 10000
+
+_worker_metro = None
+
+
+def _init_route_worker(snapshot):
+    # The frozen snapshot is pickled once per worker instead of once per query
+    global _worker_metro
+    _worker_metro = snapshot
+
+
+def _route_worker(start_station, end_station, method):
+    return _route_json(_worker_metro.shortest_path(start_station, end_station, method))
+
+
+def _route_json(route):
+    if route is None:
+        return None
+    return {"distance": route.distance, "stations": route.stations, "lines": route.lines,
+            "transfers": [list(transfer) for transfer in route.transfers]}
+
+
+class MetroServer:
+    """Asyncio TCP service answering journey queries over a Metro.
+
+    Clients send one JSON object per line, {"id": ..., "from": station, "to": station}
+    with an optional "method" of Metro.shortest_path, and get back {"id": ..., "route": ...}
+    (null if the stations are not connected) or {"id": ..., "error": ...}. {"stats": true}
+    returns stats(). Answers on a connection are written as they finish, not in order.
+
+    Queries run on a frozen snapshot of the metro, in a pool of worker processes or, with
+    workers=0, on the event loop itself (fastest for small networks). Identical queries in
+    flight share one computation and answers are kept in an LRU cache keyed by stations,
+    method and metro version, so a change to the metro is picked up by the next query.
+    """
+
+    def __init__(self, metro, workers: int = 0, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.__metro = metro
+        self.__workers = workers
+        self.__cache_size = cache_size
+        self.__cache = OrderedDict()
+        self.__in_flight = {}
+        self.__snapshot = None
+        self.__stations = set()
+        self.__pool = None
+        self.__server = None
+        self.__latencies = deque(maxlen=LATENCY_WINDOW)
+        self.__counts = dict.fromkeys(("requests", "errors", "cache_hits", "coalesced", "computed"), 0)
+
+    def __refresh(self):
+        # One snapshot, and one pool of workers holding it, per metro version
+        if self.__snapshot is not None and self.__snapshot.get_version() == self.__metro.get_version():
+            return
+        self.__snapshot = self.__metro.freeze()
+        self.__stations = set(self.__snapshot.get_stations())
+        if self.__pool is not None:
+            # Queries already sent to the old pool still finish
+            self.__pool.shutdown(wait=False)
+            self.__pool = None
+        if self.__workers > 0:
+            self.__pool = ProcessPoolExecutor(self.__workers, initializer=_init_route_worker,
+                                              initargs=(self.__snapshot,))
+
+    async def query(self, start_station, end_station, method: str = "dijkstra"):
+        """Return the route between two stations as a JSON-ready dict, or None if they are not connected."""
+        start = time.perf_counter()
+        self.__counts["requests"] += 1
+        try:
+            return await self.__query(start_station, end_station, method)
+        except Exception:
+            self.__counts["errors"] += 1
+            raise
+        finally:
+            self.__latencies.append(time.perf_counter() - start)
+
+    async def __query(self, start_station, end_station, method):
+        self.__refresh()
+        for station, role in ((start_station, "Starting"), (end_station, "Destination")):
+            if station is None:
+                raise ValueError(f"{role} station was not provided!")
+            if not isinstance(station, str) or station not in self.__stations:
+                raise ValueError(f"{role} station does not exist in the metro system.")
+        if not isinstance(method, str) or method not in ROUTING_METHODS:
+            raise ValueError(f"Unknown routing method: {method}")
+
+        key = (start_station, end_station, method, self.__snapshot.get_version())
+        if key in self.__cache:
+            self.__cache.move_to_end(key)
+            self.__counts["cache_hits"] += 1
+            return self.__cache[key]
+        task = self.__in_flight.get(key)
+        if task is None:
+            task = self.__in_flight[key] = asyncio.ensure_future(self.__compute(key))
+        else:
+            self.__counts["coalesced"] += 1
+        # A cancelled caller must not cancel the computation the others are waiting for
+        return await asyncio.shield(task)
+
+    async def __compute(self, key):
+        start_station, end_station, method, _ = key
+        try:
+            if self.__pool is None:
+                route = _route_json(self.__snapshot.shortest_path(start_station, end_station, method))
+            else:
+                route = await asyncio.get_running_loop().run_in_executor(
+                    self.__pool, _route_worker, start_station, end_station, method)
+        finally:
+            del self.__in_flight[key]
+        self.__counts["computed"] += 1
+        self.__cache[key] = route
+        if len(self.__cache) > self.__cache_size:
+            self.__cache.popitem(last=False)
+        return route
+
+    def stats(self):
+        """Return the request counters and the latencies of the last LATENCY_WINDOW queries in milliseconds."""
+        stats = dict(self.__counts, cached=len(self.__cache), in_flight=len(self.__in_flight))
+        latencies = sorted(self.__latencies)
+        if latencies:
+            def percentile(fraction):
+                return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+            stats["latency_ms"] = {"mean": sum(latencies) / len(latencies) * 1000, "p50": percentile(0.5),
+                                   "p90": percentile(0.9), "p99": percentile(0.99), "max": latencies[-1] * 1000}
+        return stats
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        """Start listening and return the (host, port) address, port 0 picks a free one."""
+        self.__refresh()
+        self.__server = await asyncio.start_server(self.__handle, host, port)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self.__server.serve_forever()
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    async def __handle(self, reader, writer):
+        answers = set()
+        try:
+            while line := await reader.readline():
+                answer = asyncio.ensure_future(self.__answer(line, writer))
+                answers.add(answer)
+                answer.add_done_callback(answers.discard)
+            if answers:
+                await asyncio.wait(answers)
+        finally:
+            writer.close()
+
+    async def __answer(self, line, writer):
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            response["id"] = request.get("id")
+            if request.get("stats"):
+                response["stats"] = self.stats()
+            else:
+                response["route"] = await self.query(request.get("from"), request.get("to"),
+                                                     request.get("method", "dijkstra"))
+        except ValueError as error:
+            response["error"] = str(error)
+        except Exception as error:
+            # Any other failure is still answered, or the client would wait for this id forever
+            response["error"] = f"{type(error).__name__}: {error}"
+        try:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def _serve(metro, host, port, workers, cache_size):
+    server = MetroServer(metro, workers, cache_size)
+    host, port = await server.start(host, port)
+    print(f"Serving journey queries on {host}:{port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Metro journey queries as JSON lines over TCP.")
+    parser.add_argument("network", help="metro network in the input.txt format, or a binary snapshot")
+    parser.add_argument("--binary", action="store_true", help="the network is a Metro.save_binary file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="0 answers on the event loop")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.binary:
+        metro = Metro.load_binary(args.network)
+    else:
+        metro = Metro()
+        metro.create_metro_from_file(args.network)
+    try:
+        asyncio.run(_serve(metro, args.host, args.port, args.workers, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+from array import array
+import json
+
+INF = float('inf')
+MAGIC = "STATIONTABLE 1"
+
+
+class StationDistanceTable:
+    """Station to station distances of a Metro, precomputed for O(1) lookups.
+
+    For every source station the table keeps the shortest path tree over the nodes, so
+    a route is rebuilt in O(path length). After set_segment_weight or close_line only
+    the source stations whose tree can change are recomputed.
+    """
+
+    def __init__(self, metro):
+        self.__metro = metro
+        self.__stations = metro.get_stations()
+        self.__index = {station: index for index, station in enumerate(self.__stations)}
+        self.__distances = []
+        self.__end_nodes = []
+        self.__trees = []
+        self.__version = None
+
+    def build(self, method="dijkstra", workers=1):
+        """Fill the table with per-source Dijkstra (over workers processes) or with Floyd-Warshall."""
+        if method == "dijkstra":
+            trees = self.__metro.shortest_path_trees(self.__stations, workers).values()
+        elif method == "floyd_warshall":
+            trees = self.__trees_from_all_pairs(*self.__metro.floyd_warshall(predecessors=True))
+        else:
+            raise ValueError(f"Unknown table method: {method}")
+
+        self.__distances, self.__end_nodes, self.__trees = [], [], []
+        for min_dist, prev_node in trees:
+            self.__add_row(min_dist, prev_node)
+        self.__version = self.__metro.get_version()
+        return self
+
+    def __trees_from_all_pairs(self, dist, prev):
+        # A station's tree takes, for every node, the predecessor seen from its closest source node
+        trees = []
+        n = self.__metro.get_vertex_bound()
+        for station in self.__stations:
+            sources = self.__metro.get_station_nodes(station)
+            min_dist, prev_node = array("d", [INF] * n), array("q", [-1] * n)
+            for node in range(n):
+                source = min(sources, key=lambda source_node: dist[source_node][node])
+                min_dist[node] = dist[source][node]
+                if min_dist[node] not in (0, INF):
+                    prev_node[node] = prev[source][node]
+            trees.append((min_dist, prev_node))
+        return trees
+
+    def __add_row(self, min_dist, prev_node, row=None):
+        distances, end_nodes = array("d"), array("q")
+        for station in self.__stations:
+            end_node = min(self.__metro.get_station_nodes(station), key=min_dist.__getitem__)
+            distances.append(min_dist[end_node])
+            end_nodes.append(end_node)
+        if row is None:
+            self.__distances.append(distances)
+            self.__end_nodes.append(end_nodes)
+            self.__trees.append((min_dist, prev_node))
+        else:
+            self.__distances[row], self.__end_nodes[row], self.__trees[row] = distances, end_nodes, (min_dist, prev_node)
+
+    def is_current(self):
+        """Tell whether the metro is unchanged since the table was built or last updated."""
+        return self.__version == self.__metro.get_version()
+
+    def __check_current(self):
+        if not self.is_current():
+            raise ValueError("The metro changed since the station table was built, update it through the table")
+
+    def distance(self, start_station, end_station):
+        self.__check_current()
+        return self.__distances[self.__index[start_station]][self.__index[end_station]]
+
+    def route(self, start_station, end_station):
+        """Return the Route between two stations, or None if they are not connected."""
+        self.__check_current()
+        row, column = self.__index[start_station], self.__index[end_station]
+        distance = self.__distances[row][column]
+        if distance == INF:
+            return None
+        node_path = self.__metro._node_path(self.__end_nodes[row][column], self.__trees[row][1])
+        return self.__metro._build_route(distance, node_path)
+
+    def set_segment_weight(self, from_station, to_station, weight, line=None):
+        """Change a segment of the metro and update the rows it affects."""
+        return self.__apply(self.__metro.set_segment_weight(from_station, to_station, weight, line))
+
+    def set_transfer_penalty(self, station, penalty):
+        """Change the transfer time of a station of the metro and update the rows it affects."""
+        return self.__apply(self.__metro.set_transfer_penalty(station, penalty))
+
+    def close_line(self, line):
+        """Close a line of the metro and update the rows it affects."""
+        return self.__apply(self.__metro.close_line(line))
+
+    def __apply(self, changes):
+        """Recompute only the rows of the source stations whose shortest path tree the changes can alter.
+
+        Returns those source stations.
+        """
+        directed_changes = []
+        for node1, node2, old_weight, new_weight in changes:
+            directed_changes.append((node1, node2, old_weight, new_weight))
+            if self.__metro.is_reversible():
+                directed_changes.append((node2, node1, old_weight, new_weight))
+
+        affected = [row for row in range(len(self.__stations))
+                    if any(self.__edge_matters(row, *change) for change in directed_changes)]
+        for row in affected:
+            self.__add_row(*self.__metro.shortest_path_tree(self.__stations[row]), row=row)
+        self.__version = self.__metro.get_version()
+        return [self.__stations[row] for row in affected]
+
+    def __edge_matters(self, row, x, y, old_weight, new_weight):
+        min_dist, prev_node = self.__trees[row]
+        if new_weight == 0 or new_weight > old_weight:
+            # A removed or slower edge only matters to a tree that uses it
+            return prev_node[y] == x
+        # A faster edge only matters if it now gives a shorter way to y
+        return min_dist[x] + new_weight < min_dist[y]
+
+    def save(self, file_name):
+        """Write the table to file_name: a JSON header line followed by the raw arrays of every row."""
+        header = {"format": MAGIC, "stations": self.__stations, "nodes": self.__metro.get_vertex_bound()}
+        with open(file_name, "wb") as file:
+            file.write(json.dumps(header).encode() + b"\n")
+            for distances, end_nodes, (min_dist, prev_node) in zip(self.__distances, self.__end_nodes, self.__trees):
+                for values in (distances, end_nodes, min_dist, prev_node):
+                    values.tofile(file)
+
+    @staticmethod
+    def load(file_name, metro):
+        """Read a table saved for metro; the network must not have changed since it was saved."""
+        table = StationDistanceTable(metro)
+        with open(file_name, "rb") as file:
+            header = json.loads(file.readline())
+            if header.get("format") != MAGIC:
+                raise ValueError(f"{file_name} is not a station distance table")
+            if header["stations"] != table.__stations or header["nodes"] != metro.get_vertex_bound():
+                raise ValueError(f"{file_name} was built for a different metro network")
+            stations, nodes = len(table.__stations), header["nodes"]
+            for _ in range(stations):
+                row = []
+                for typecode, count in (("d", stations), ("q", stations), ("d", nodes), ("q", nodes)):
+                    values = array(typecode)
+                    values.fromfile(file, count)
+                    row.append(values)
+                table.__distances.append(row[0])
+                table.__end_nodes.append(row[1])
+                table.__trees.append((row[2], row[3]))
+        table.__version = metro.get_version()
+        return table
@@ -1,5 +1,30 @@
+import io
+import math
+import os
+import pickle
+import sys
+import tempfile
+import time
+import traceback
 import unittest
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
 from Graph import Graph
+import Benchmark
+import GraphGenerators
+from GraphCache import ConnectivityIndex
+from GraphErrors import CycleError, NotEulerianError
+from GraphLoader import read_edge_file
+from GraphProfiler import PROFILER
+from main import postorder_traversal
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+STORAGES = ("matrix", "adjacency", "csr") + (("numpy",) if numpy is not None else ())
 
 
 class TestGraph(unittest.TestCase):
@@ -58,6 +83,13 @@ class TestGraph(unittest.TestCase):
         g.create_random(5, max_weight=10)
         self.assertEqual(g.get_n(), 5)
         self.assertTrue(any(weight != 0 for row in g.get_graph() for weight in row))
+        self.assertFalse(g.is_reversible())
+        g.create_random(30, directed=False, p=0.2, seed=7)
+        self.assertTrue(g.is_reversible())
+        edges = g.get_edges()
+        self.assertTrue(all(g.get_weight(y, x) == weight and x != y for x, y, weight in edges))
+        g.create_random(30, directed=False, p=0.2, seed=7)
+        self.assertEqual(g.get_edges(), edges)
 
     def test_deg(self):
         g = Graph(reversible=True)
@@ -96,6 +128,530 @@ class TestGraph(unittest.TestCase):
             iterator.next()
 
 
+    def test_storage_backends(self):
+        for storage in STORAGES:
+            g = Graph(reversible=False, weighted=True, storage=storage)
+            for _ in range(4):
+                g.add_vertex()
+            g.add_edge(0, 2, 4)
+            g.add_edge(0, 1, 3)
+            g.add_edge(3, 0, 7)
+            self.assertEqual(g.get_edges(), [(0, 1, 3), (0, 2, 4), (3, 0, 7)])
+            self.assertEqual(g.outbound_edges(0), [(0, 1, 3), (0, 2, 4)])
+            self.assertEqual(g.inbound_edges(0), [(3, 0, 7)])
+            self.assertEqual(g.deg(0), 3)
+            self.assertTrue(g.is_edge(3, 0))
+            g.remove_edge(0, 1)
+            self.assertFalse(g.is_edge(0, 1))
+            g.remove_vertex(1)
+            self.assertEqual(g.get_edges(), [(0, 2, 4), (3, 0, 7)])
+            g_copy = g.copy_graph()
+            g.add_edge(2, 3, 1)
+            self.assertEqual(g_copy.get_edges(), [(0, 2, 4), (3, 0, 7)])
+            self.assertEqual(g_copy.get_storage(), storage)
+
+    def test_csr_interleaved_edits(self):
+        graphs = [Graph(reversible=True, weighted=True, storage=storage) for storage in ("csr", "adjacency")]
+        answers = []
+        for g in graphs:
+            for _ in range(3000):
+                g.add_vertex()
+            start = time.perf_counter()
+            seen = []
+            for x in range(2999):
+                g.add_edge(x, x + 1, x % 5 + 1)
+                seen.append((g.outbound_edges(x), g.is_edge(x + 1, x), g.deg(x), g.get_weight(x, x + 1)))
+                if x % 3 == 0:
+                    g.remove_edge(x, x + 1)
+            # Every edit used to repack the whole CSR graph, which took tens of seconds here
+            self.assertLess(time.perf_counter() - start, 2)
+            answers.append((seen, g.get_edges(), g.component_count()))
+        self.assertEqual(answers[0], answers[1])
+
+    def test_stable_vertex_ids(self):
+        for storage in STORAGES:
+            g = Graph(reversible=False, storage=storage)
+            for _ in range(5):
+                g.add_vertex()
+            g.add_edge(1, 4)
+            g.add_edge(3, 1)
+            g.remove_vertex(2)
+            self.assertEqual(g.get_n(), 4)
+            self.assertFalse(g.is_vertex(2))
+            self.assertTrue(g.is_edge(1, 4))
+            self.assertRaises(ValueError, g.add_edge, 2, 1)
+            self.assertEqual(g.add_vertex(), 5)
+            self.assertEqual(g.compact(), [0, 1, -1, 2, 3, 4])
+            self.assertEqual(g.get_edges(), [(1, 3), (2, 1)])
+            self.assertEqual(list(g.vertices()), [0, 1, 2, 3, 4])
+
+    def test_add_edges_bulk(self):
+        for storage in STORAGES:
+            g = Graph(reversible=True, weighted=True, storage=storage)
+            for _ in range(4):
+                g.add_vertex()
+            g.add_edges_bulk([(0, 1, 5), (1, 2), (1, 0, 7)])
+            self.assertEqual(g.get_edges(), [(0, 1, 7), (1, 0, 7), (1, 2, 1), (2, 1, 1)])
+            g.add_edge_arrays(array("q", [2, 3]), array("q", [3, 0]), [4, 6])
+            self.assertEqual(g.get_weight(0, 3), 6)
+            self.assertRaises(ValueError, g.add_edges_bulk, [(0, 2), (0, 4)])
+            self.assertFalse(g.is_edge(0, 2))
+
+    def test_read_edge_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "graph.txt")
+            with open(file_name, "w") as file:
+                file.write("4 3 F T\n0 1 12\n1 2 345\n3 0 6789")
+            for use_mmap in (False, True):
+                n, reversible, weighted, sources, targets, weights = read_edge_file(file_name, use_mmap, chunk_size=4)
+                self.assertEqual((n, reversible, weighted), (4, False, True))
+                self.assertEqual(list(sources), [0, 1, 3])
+                self.assertEqual(list(targets), [1, 2, 0])
+                self.assertEqual(list(weights), [12, 345, 6789])
+            with open(file_name, "a") as file:
+                file.write("\n# generated graph\nend")
+            for use_mmap in (False, True):
+                for chunk_size in (4, 1 << 20):
+                    self.assertEqual(list(read_edge_file(file_name, use_mmap, chunk_size)[5]), [12, 345, 6789])
+            with open(file_name, "w") as file:
+                file.write("3 2 F F\n0 1 1\n1 2 1")
+            for use_mmap in (False, True):
+                for chunk_size in (4, 1 << 20):
+                    _, _, _, sources, targets, _ = read_edge_file(file_name, use_mmap, chunk_size)
+                    self.assertEqual(list(zip(sources, targets)), [(0, 1), (1, 2)])
+            with open(file_name, "w") as file:
+                file.write("3 2 F F\n0 1\n1\n")
+            self.assertRaises(ValueError, read_edge_file, file_name)
+        g = Graph.create_from_file("graph.txt", use_mmap=True)
+        self.assertEqual(len(g.get_edges()), 7)
+        self.assertTrue(g.is_edge(5, 0))
+
+    def test_binary_round_trip(self):
+        g = Graph(reversible=False, weighted=True, storage="adjacency")
+        for _ in range(4):
+            g.add_vertex()
+        g.add_edges_bulk([(0, 1, 2.5), (1, 3, 4), (3, 0, 1)])
+        g.remove_vertex(2)
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "graph.bin")
+            g.save_binary(file_name)
+            loaded = Graph.load_binary(file_name)
+            self.assertEqual(loaded.get_storage(), "csr")
+            self.assertEqual(loaded.get_edges(), g.get_edges())
+            self.assertEqual(loaded.inbound_edges(0), [(3, 0, 1)])
+            self.assertFalse(loaded.is_vertex(2))
+            self.assertEqual(loaded.add_vertex(), 4)
+            loaded.add_edge(4, 0, 7)
+            self.assertEqual(loaded.outbound_edges(4), [(4, 0, 7)])
+            del loaded
+
+            # Mixed int and float weights, and integers beyond 64 bits, keep their exact types
+            g.add_edge(0, 3, 2 ** 70)
+            g.use_storage("csr")
+            weight_types = [(edge, type(edge[2])) for edge in g.get_edges()]
+            self.assertEqual(weight_types, [((0, 1, 2.5), float), ((0, 3, 2 ** 70), int), ((1, 3, 4), int),
+                                            ((3, 0, 1), int)])
+            self.assertIn("Weight: 4\n", str(g))
+            g.save_binary(file_name)
+            loaded = Graph.load_binary(file_name)
+            self.assertEqual([(edge, type(edge[2])) for edge in loaded.get_edges()], weight_types)
+            self.assertEqual([(edge, type(edge[2])) for edge in g.freeze().get_edges()], weight_types)
+            del loaded
+
+            floats = Graph(False, True, "csr")
+            for _ in range(2):
+                floats.add_vertex()
+            floats.add_edge(0, 1, 1.5)
+            floats.save_binary(file_name)
+            self.assertEqual(Graph.load_binary(file_name).outbound_edges(0), [(0, 1, 1.5)])
+
+    def test_dag_and_topological_sort(self):
+        g = Graph.create_from_file("graph.txt")
+        self.assertFalse(g.is_dag())
+        g.remove_edge(4, 2)
+        g.remove_edge(5, 0)
+        self.assertTrue(g.is_dag())
+        self.assertEqual(g.topological_sort(), [0, 1, 2, 5, 3, 4])
+
+    def test_topological_layers(self):
+        g = Graph.create_from_file("graph.txt")
+        with self.assertRaises(CycleError) as context:
+            g.topological_layers()
+        self.assertEqual(context.exception.cycle, [0, 1, 2, 5])
+        self.assertRaises(CycleError, g.count_paths, 0, 3)
+        g.remove_edge(5, 0)
+        with self.assertRaises(CycleError) as context:
+            g.count_paths(0, 3)
+        self.assertEqual(context.exception.cycle, [2, 3, 4])
+        depths = []
+        for _ in range(50):
+            try:
+                g.count_paths(0, 3)
+            except CycleError as error:
+                depths.append(len(traceback.extract_tb(error.__traceback__)))
+        self.assertEqual(depths[-1], depths[0])
+        g.remove_edge(4, 2)
+        g.add_edge(0, 2)
+        self.assertEqual(g.topological_layers(), [[0], [1], [2], [3, 5], [4]])
+        self.assertEqual(g.count_paths(0, 4), 2)
+
+    def test_query_cache(self):
+        for storage in ("matrix", "adjacency"):
+            g = Graph(reversible=False, storage=storage)
+            for _ in range(3):
+                g.add_vertex()
+            g.add_edges_bulk([(0, 1), (1, 2)])
+            version = g.get_version()
+            self.assertTrue(g.is_dag())
+            order = g.topological_sort()
+            order.append(7)
+            self.assertEqual(g.topological_sort(), [0, 1, 2])
+            self.assertEqual(g.deg(1), 2)
+            self.assertEqual(g.get_version(), version)
+            g.add_edge(2, 0)
+            self.assertGreater(g.get_version(), version)
+            self.assertFalse(g.is_dag())
+            self.assertEqual(g.deg(0), 2)
+            g.add_edge(2, 0)
+            self.assertEqual(g.deg(0), 2)
+            g.remove_edge(0, 1)
+            self.assertTrue(g.is_dag())
+            self.assertEqual((g.deg(0), g.deg(1)), (1, 1))
+            g.remove_vertex(2)
+            self.assertEqual(g.deg(0), 0)
+            self.assertEqual(g.add_vertex(), 3)
+            g.add_edge(3, 1)
+            self.assertEqual((g.deg(1), g.deg(3)), (1, 1))
+
+    def test_eulerian_circuit_and_path(self):
+        g = Graph(reversible=True, storage="adjacency")
+        for _ in range(5):
+            g.add_vertex()
+        g.add_edges_bulk([(0, 1), (1, 2), (2, 0), (0, 3), (3, 4), (4, 0)])
+        self.assertTrue(g.is_eulerian())
+        self.assertEqual(g.find_eulerian_circuit(), [0, 1, 2, 0, 3, 4, 0])
+        g.remove_edge(4, 0)
+        self.assertFalse(g.is_eulerian())
+        self.assertRaises(NotEulerianError, g.find_eulerian_circuit)
+        self.assertEqual(g.find_eulerian_path(), [0, 1, 2, 0, 3, 4])
+
+    def test_directed_eulerian(self):
+        g = Graph.create_from_file("graph.txt")
+        self.assertTrue(g.is_eulerian())
+        self.assertEqual(g.find_eulerian_circuit(), [0, 1, 2, 3, 4, 2, 5, 0])
+        g.add_edge(2, 1)
+        self.assertFalse(g.is_eulerian())
+        self.assertEqual(g.find_eulerian_path(), [2, 1, 2, 3, 4, 2, 5, 0, 1])
+        g.add_edge(3, 0)
+        self.assertRaises(NotEulerianError, g.find_eulerian_path)
+        g = Graph(reversible=False)
+        for _ in range(4):
+            g.add_vertex()
+        g.add_edges_bulk([(0, 1), (1, 0), (2, 3), (3, 2)])
+        with self.assertRaises(NotEulerianError) as context:
+            g.find_eulerian_circuit()
+        self.assertEqual(str(context.exception), "The graph is not connected.")
+
+    def test_count_paths_modes(self):
+        n = 200
+        g = Graph(reversible=False, storage="adjacency")
+        for _ in range(n):
+            g.add_vertex()
+        # Two parallel routes between consecutive vertices of a ladder double the count each step
+        g.add_edges_bulk([(i, i + 1) for i in range(n - 1)] + [(i, i + 2) for i in range(0, n - 2, 2)])
+        exact = g.count_paths(0, n - 1)
+        self.assertEqual(exact, g.count_paths_from(0)[n - 1])
+        self.assertEqual(exact, g.count_paths_to(n - 1)[0])
+        self.assertEqual(g.count_paths(0, n - 1, modulus=1000000007), exact % 1000000007)
+        self.assertAlmostEqual(g.count_paths(0, n - 1, log_space=True), math.log(exact))
+        self.assertEqual(g.count_paths(5, 2), 0)
+        self.assertEqual(g.count_paths(5, 2, log_space=True), -math.inf)
+        self.assertRaises(ValueError, g.count_paths, 0, 1, 7, True)
+
+    def test_deep_chain_traversal(self):
+        n = 100000
+        g = Graph(reversible=False, storage="adjacency")
+        for _ in range(n):
+            g.add_vertex()
+        g.add_edge_arrays(array("q", range(n - 1)), array("q", range(1, n)))
+        self.assertTrue(g.is_dag())
+        self.assertEqual(g.topological_sort(), list(range(n)))
+        g.add_edge(n - 1, 0)
+        self.assertFalse(g.is_dag())
+        self.assertTrue(g.is_eulerian())
+
+    def test_use_storage(self):
+        g = Graph.create_from_file("graph.txt")
+        edges = g.get_edges()
+        g.use_storage("csr")
+        self.assertEqual(g.get_storage(), "csr")
+        self.assertEqual(g.get_edges(), edges)
+        self.assertEqual(g.topological_sort(), Graph.create_from_file("graph.txt").topological_sort())
+
+    def test_dense_algorithms(self):
+        inf = float('inf')
+        for storage in STORAGES:
+            g = Graph(reversible=False, weighted=True, storage=storage)
+            for _ in range(5):
+                g.add_vertex()
+            g.add_edges_bulk([(0, 1, 4), (1, 2, 1), (0, 2, 7), (2, 0, 2), (3, 4, 2.5)])
+            self.assertEqual([type(edge[2]) for edge in g.get_edges()], [int, int, int, int, float])
+            g.add_edge(4, 3, 2 ** 70)
+            self.assertEqual((g.get_weight(4, 3), type(g.get_weight(0, 1))), (2 ** 70, int))
+            g.remove_edge(4, 3)
+            self.assertEqual(g.deg(0), 3)
+            self.assertEqual(list(g.reachable(1)), [1, 1, 1, 0, 0])
+            closure = [[bool(flag) for flag in row] for row in g.transitive_closure()]
+            self.assertEqual(closure[0], [True, True, True, False, False])
+            self.assertEqual(closure[4], [False, False, False, False, True])
+            dist = [list(row) for row in g.floyd_warshall()]
+            self.assertEqual(dist[0], [0, 4, 5, inf, inf])
+            self.assertEqual(dist[2], [2, 6, 0, inf, inf])
+            self.assertEqual(dist[3][4], 2.5)
+            dist, prev = g.floyd_warshall(predecessors=True)
+            self.assertEqual([list(row) for row in prev][:3], [[-1, 0, 1, -1, -1], [2, -1, 1, -1, -1],
+                                                               [2, 0, -1, -1, -1]])
+            g.remove_vertex(1)
+            self.assertEqual(list(g.reachable(0)), [1, 0, 1, 0, 0])
+            self.assertEqual([list(row) for row in g.floyd_warshall()][0][:3], [0, inf, 7])
+
+    def test_generators(self):
+        for directed in (True, False):
+            g = GraphGenerators.gnp(40, 0.1, directed, seed=3, storage="adjacency")
+            self.assertEqual(g.get_edges(), GraphGenerators.gnp(40, 0.1, directed, seed=3).get_edges())
+            self.assertTrue(0 < len(g.get_edges()) < 40 * 39 / 2)
+            self.assertEqual(len(GraphGenerators.gnp(6, 1, directed).get_edges()), 30)
+            self.assertEqual(len(GraphGenerators.gnm(20, 50, directed, seed=1).get_edges()), 50 if directed else 100)
+        self.assertRaises(ValueError, GraphGenerators.gnm, 4, 7, False)
+        self.assertRaises(ValueError, GraphGenerators.gnp, 4, 1.5)
+
+        g = GraphGenerators.barabasi_albert(50, 2, weighted=True, seed=5, storage="csr")
+        self.assertEqual(len(g.get_edges()), 2 * 2 * 48)
+        self.assertTrue(all(1 <= weight <= 10 for _, _, weight in g.get_edges()))
+        self.assertTrue(GraphGenerators.random_dag(60, 0.3, seed=2, storage="adjacency").is_dag())
+        g = GraphGenerators.grid(3, 4)
+        self.assertEqual(len(g.get_edges()), 2 * (3 * 3 + 2 * 4))
+        self.assertEqual(g.deg(5), 4)
+
+    def test_lazy_traversals(self):
+        g = Graph.create_from_file("graph.txt")
+        iterator = g.iter_vertex(0)
+        order = []
+        iterator.first()
+        while iterator.valid():
+            order.append(iterator.get_current())
+            iterator.next()
+        self.assertEqual(sorted(order), [vertex for vertex, _, _ in iterator])
+        self.assertEqual(list(iterator)[0], (0, 0, None))
+        for vertex, depth, parent in iterator.bfs():
+            if parent is not None:
+                self.assertTrue(g.is_edge(parent, vertex))
+        self.assertEqual([depth for _, depth, _ in g.iter_vertex(0).bfs()], sorted(depth for _, depth, _ in iterator.bfs()))
+        self.assertTrue(all(depth <= 1 for _, depth, _ in iterator.bfs(max_depth=1)))
+        self.assertTrue(all(depth <= 2 for _, depth, _ in iterator.dfs(max_depth=2)))
+        self.assertEqual(list(iterator.dfs(max_depth=0)), [(0, 0, None)])
+
+        chain = GraphGenerators.grid(1, 5000, storage="adjacency")
+        walk = chain.iter_vertex(0).dfs()
+        self.assertEqual([next(walk) for _ in range(3)], [(0, 0, None), (1, 1, 0), (2, 2, 1)])
+        self.assertEqual(list(chain.iter_vertex(0))[-1], (4999, 4999, 4998))
+
+    def test_tree_reconstruction(self):
+        g = Graph(reversible=False)
+        for _ in range(8):
+            g.add_vertex()
+        inorder, preorder = [4, 2, 5, 1, 6, 3, 7], [1, 2, 4, 5, 3, 6, 7]
+        root = g.build_tree_from_inorder_preorder(inorder, preorder)
+        self.assertEqual(preorder, [1, 2, 4, 5, 3, 6, 7])
+        self.assertEqual((root.value, root.left.value, root.right.left.value), (1, 2, 6))
+        self.assertEqual(postorder_traversal(root), [4, 5, 2, 6, 7, 3, 1])
+        g.add_tree_edges(root)
+        self.assertEqual(g.get_edges(), [(1, 8), (1, 9), (1, 12), (2, 10), (2, 11), (3, 13), (3, 14)])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            g.print_tree(root)
+        self.assertEqual(output.getvalue().splitlines()[:3], ["Root:1", "  L---2", "    L---4"])
+        self.assertRaises(ValueError, g.build_tree_from_inorder_preorder, [1, 2, 3], [2, 3, 1])
+        self.assertRaises(ValueError, g.build_tree_from_inorder_preorder, [1, 2], [1, 4])
+
+        # A 200000 node left spine would overflow the recursion limit of a recursive build
+        n = 200000
+        root = g.build_tree_from_inorder_preorder(list(range(n)), list(range(n - 1, -1, -1)))
+        self.assertEqual(postorder_traversal(root)[:3], [0, 1, 2])
+
+    def test_strongly_connected_components(self):
+        g = Graph(reversible=False, weighted=True, storage="adjacency")
+        for _ in range(7):
+            g.add_vertex()
+        g.add_edges_bulk([(0, 1, 1), (1, 2, 1), (2, 0, 1), (2, 3, 5), (1, 3, 2), (3, 4, 1), (4, 3, 1), (6, 5, 1)])
+        component, count = g.strongly_connected_components()
+        self.assertEqual(count, 4)
+        self.assertEqual(len({component[0], component[1], component[2]}), 1)
+        self.assertEqual(component[3], component[4])
+        self.assertTrue(all(component[x] < component[y] for x, y, _ in g.get_edges() if component[x] != component[y]))
+
+        dag = g.condensation()
+        self.assertEqual(dag.get_n(), 4)
+        self.assertTrue(dag.is_dag())
+        self.assertEqual(dag.get_weight(component[0], component[3]), 2)
+        self.assertEqual(dag.count_paths(component[1], component[4]), 1)
+        component[0] = 99
+        self.assertNotEqual(g.strongly_connected_components()[0][0], 99)
+        g.remove_vertex(6)
+        self.assertEqual(g.strongly_connected_components()[0][6], -1)
+
+        chain = GraphGenerators.grid(1, 100000, storage="adjacency")
+        self.assertEqual(chain.strongly_connected_components()[1], 1)
+        dag = GraphGenerators.random_dag(500, 0.01, seed=4, storage="adjacency")
+        self.assertEqual(dag.strongly_connected_components()[1], 500)
+
+    def test_connectivity_index(self):
+        g = Graph(reversible=False, storage="adjacency")
+        for _ in range(6):
+            g.add_vertex()
+        g.add_edge(0, 1)
+        g.add_edge(2, 1)
+        self.assertTrue(g.same_component(0, 2))
+        self.assertEqual(g.component_count(), 4)
+        self.assertEqual(g.component_size(1), 3)
+        g.add_edges_bulk([(3, 4), (4, 0)])
+        self.assertEqual((g.component_count(), g.component_size(3)), (2, 5))
+        self.assertEqual(g.add_vertex(), 6)
+        self.assertEqual(g.component_count(), 3)
+        g.remove_edge(4, 0)
+        self.assertFalse(g.same_component(3, 0))
+        self.assertEqual(g.component_count(), 4)
+        g.remove_vertex(1)
+        self.assertEqual((g.component_count(), g.component_size(0)), (5, 1))
+        self.assertRaises(ValueError, g.same_component, 0, 1)
+
+        g = GraphGenerators.gnp(300, 0.004, directed=False, seed=9, storage="adjacency")
+        component, count = g.strongly_connected_components()
+        self.assertEqual(g.component_count(), count)
+        self.assertTrue(all(g.same_component(x, y) == (component[x] == component[y]) for x in range(0, 300, 7)
+                            for y in range(0, 300, 11)))
+
+    def test_profiler(self):
+        g = Graph.create_from_file("graph.txt", storage="adjacency")
+        g.add_edge(0, 3)
+        self.assertEqual(PROFILER.snapshot()["counters"], {})
+
+        events = []
+        trace = lambda name, value: events.append(name)
+        PROFILER.add_trace(trace)
+        try:
+            with PROFILER.scope() as outer:
+                g.add_edge(0, 4)
+                with PROFILER.scope() as query:
+                    g.is_dag()
+                    g.is_dag()
+                    iterator = g.iter_vertex(0)
+                    iterator.first()
+                    while iterator.valid():
+                        iterator.next()
+        finally:
+            PROFILER.remove_trace(trace)
+        self.assertEqual(query["counters"]["cache.misses"], 1)
+        self.assertEqual(query["counters"]["cache.hits"], 1)
+        self.assertEqual(query["timers"]["graph.is_dag"]["calls"], 1)
+        self.assertEqual(query["counters"]["iterator.next"], g.get_n())
+        self.assertEqual(query["counters"]["iterator.neighbour_probes"], len(g.get_edges()))
+        self.assertNotIn("graph.add_edge", query["counters"])
+        self.assertEqual(outer["counters"]["graph.add_edge"], 1)
+        self.assertEqual(outer["counters"]["cache.misses"], 1)
+        self.assertIn("graph.is_dag", events)
+        self.assertFalse(PROFILER.enabled)
+
+    def test_freeze_and_thaw(self):
+        g = Graph.create_from_file("graph.txt")
+        g.remove_edge(4, 2)
+        g.remove_edge(5, 0)
+        frozen = g.freeze()
+        self.assertTrue(frozen.is_frozen())
+        self.assertEqual(frozen.get_storage(), "csr")
+        self.assertEqual(frozen.get_edges(), g.get_edges())
+        self.assertEqual(frozen.outbound_edges(1), g.outbound_edges(1))
+        self.assertEqual(frozen.topological_sort(), g.topological_sort())
+        self.assertEqual(frozen.count_paths(0, 4), g.count_paths(0, 4))
+        self.assertEqual(list(frozen.iter_vertex(0)), list(g.iter_vertex(0)))
+        for change in (frozen.add_vertex, lambda: frozen.add_edge(0, 3), lambda: frozen.remove_edge(0, 1),
+                       lambda: frozen.remove_vertex(2), lambda: frozen.use_storage("adjacency")):
+            self.assertRaises(ValueError, change)
+        self.assertEqual(frozen.get_edges(), g.get_edges())
+
+        g.add_edge(4, 0)
+        self.assertFalse(frozen.is_edge(4, 0))
+        with ThreadPoolExecutor(4) as pool:
+            self.assertEqual(set(pool.map(lambda _: tuple(frozen.topological_sort()), range(8))),
+                             {tuple(frozen.topological_sort())})
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)).get_edges(), frozen.get_edges())
+
+        thawed = frozen.thaw()
+        self.assertFalse(thawed.is_frozen())
+        self.assertEqual(thawed.get_storage(), "csr")
+        thawed.add_vertex()
+        thawed.add_edge(4, 6)
+        self.assertTrue(thawed.is_edge(4, 6))
+        self.assertEqual(frozen.get_n(), 6)
+        self.assertFalse(frozen.is_edge(4, 6))
+        self.assertEqual(thawed.get_storage(), g.get_storage())
+        refrozen = frozen.thaw().freeze().thaw()
+        refrozen.add_vertex()
+        self.assertEqual(refrozen.get_storage(), g.get_storage())
+        self.assertRaises(ValueError, g.thaw)
+
+        big = GraphGenerators.gnp(3000, 0.001, storage="adjacency").freeze().thaw()
+        start = time.perf_counter()
+        for x in range(300):
+            big.add_edge(x, (x + 1) % 3000)
+        # Every edit used to repack the CSR arrays, which took seconds here
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(big.get_storage(), "adjacency")
+
+    def test_frozen_concurrent_reads(self):
+        g = GraphGenerators.gnp(5000, 2e-4, directed=False, seed=5, storage="adjacency")
+        pairs = [(x, (x * 7919) % 5000) for x in range(0, 5000, 37)]
+        expected = (g.component_count(), [g.same_component(x, y) for x, y in pairs],
+                    [g.component_size(x) for x, _ in pairs])
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for _ in range(3):
+                frozen = g.freeze()
+                with ThreadPoolExecutor(8) as pool:
+                    answers = list(pool.map(lambda _: (frozen.component_count(),
+                                                       [frozen.same_component(x, y) for x, y in pairs],
+                                                       [frozen.component_size(x) for x, _ in pairs]), range(8)))
+                self.assertEqual(answers, [expected] * 8)
+                # The index is also safe to build lazily from several threads at once
+                index = ConnectivityIndex()
+                with ThreadPoolExecutor(8) as pool:
+                    counts = list(pool.map(lambda _: index.get(frozen._storage).get_count(), range(8)))
+                self.assertEqual(counts, [expected[0]] * 8)
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_benchmark(self):
+        results = Benchmark.run_benchmarks(sizes=(30,), densities=(0.1,), repeat=1)
+        self.assertEqual(len(results), len(Benchmark.BENCHMARKS))
+        self.assertIn("metro_dijkstra/n=30", results)
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "baseline.json")
+            Benchmark.save_baseline(results, file_name)
+            baseline = Benchmark.load_baseline(file_name)
+            self.assertRaises(ValueError, Benchmark.load_baseline, file_name, "csr")
+            self.assertRaises(ValueError, Benchmark.load_baseline, file_name, "adjacency", 1)
+            with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                Benchmark.main(["--sizes", "30", "--storage", "csr", "--baseline", file_name])
+        self.assertEqual(Benchmark.find_regressions(results, baseline), [])
+        slower = {key: {"seconds": result["seconds"] * 2 + 0.01, "peak_bytes": result["peak_bytes"]}
+                  for key, result in results.items()}
+        self.assertEqual({metric for _, metric, _, _ in Benchmark.find_regressions(slower, baseline)}, {"seconds"})
+
+    @unittest.skipIf(numpy is not None, "NumPy is installed")
+    def test_numpy_storage_missing(self):
+        self.assertRaises(ValueError, Graph, False, True, "numpy")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,284 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from ContractionHierarchy import ContractionHierarchy
+from GraphGenerators import metro_network
+from GraphProfiler import PROFILER
+from Metro import Metro, Route
+from MetroServer import MetroServer
+from StationTable import StationDistanceTable
+
+
+def dijkstra_output(metro, start_station):
+    output = io.StringIO()
+    with redirect_stdout(output):
+        metro.dijkstra(start_station)
+    return output.getvalue()
+
+
+class TestMetro(unittest.TestCase):
+    def setUp(self):
+        self.metro = Metro()
+        self.metro.create_metro_from_file("input.txt")
+
+    def test_dijkstra(self):
+        output = dijkstra_output(self.metro, "s1")
+        self.assertIn("Distance from s1 to s4: 7 minutes\nPath: s1, s2, s3, s4\n", output)
+        self.assertIn("Distance from s1 to s17: 27 minutes", output)
+
+    def test_shortest_path(self):
+        route = self.metro.shortest_path("s1", "s17")
+        self.assertEqual(route, Route(27, ["s1", "s2", "s3", "s4", "s5", "s6", "s13", "s14", "s17"],
+                                      ["M1", "M4"], [("s13", "M1", "M4")]))
+        self.assertEqual(self.metro.shortest_path("s1", "s1").distance, 0)
+        self.assertRaises(ValueError, self.metro.shortest_path, "s1", "s99")
+        output = dijkstra_output(self.metro, "s8")
+        for station in ("s1", "s11", "s14"):
+            self.assertIn(f"Distance from s8 to {station}: {self.metro.shortest_path('s8', station).distance} minutes",
+                          output)
+
+    def test_bidirectional_and_astar(self):
+        stations = [f"s{index}" for index in range(1, 18)]
+        self.assertRaises(ValueError, self.metro.shortest_path, "s1", "s17", "astar")
+        self.metro.set_station_coordinates({station: (index % 5, index // 5) for index, station in enumerate(stations)})
+        for method in ("bidirectional", "astar"):
+            for start_station in stations:
+                for end_station in stations:
+                    expected = self.metro.shortest_path(start_station, end_station)
+                    route = self.metro.shortest_path(start_station, end_station, method)
+                    self.assertEqual(route.distance, expected.distance)
+                    self.assertEqual((route.stations[0], route.stations[-1]), (start_station, end_station))
+        self.metro.prepare_landmarks(3)
+        self.assertEqual(self.metro.shortest_path("s8", "s17", "astar").distance,
+                         self.metro.shortest_path("s8", "s17").distance)
+
+    def test_shortest_path_trees(self):
+        trees = self.metro.shortest_path_trees()
+        self.assertEqual(list(trees), self.metro.get_stations())
+        min_dist, prev_node = trees["s1"]
+        self.assertEqual((min_dist.typecode, prev_node.typecode), ("d", "q"))
+        self.assertEqual(min(min_dist[node] for node in self.metro.get_station_nodes("s17")), 27)
+        self.assertEqual(self.metro.shortest_path_trees(["s8", "s1", "s14"], workers=2),
+                         {station: trees[station] for station in ("s8", "s1", "s14")})
+        self.assertRaises(ValueError, self.metro.shortest_path_trees, ["s99"])
+
+    def test_metro_network(self):
+        metro = metro_network(6, 8, 6, seed=11)
+        self.assertEqual(metro.get_stations(), metro_network(6, 8, 6, seed=11).get_stations())
+        stations = metro.get_stations()[:10]
+        for start_station in stations:
+            for end_station in stations:
+                expected = metro.shortest_path(start_station, end_station)
+                route = metro.shortest_path(start_station, end_station, "astar")
+                self.assertEqual(route.distance if route else None, expected.distance if expected else None)
+
+    def test_profiling(self):
+        with PROFILER.scope() as full:
+            dijkstra_output(self.metro, "s1")
+        with PROFILER.scope() as query:
+            self.metro.shortest_path("s1", "s2")
+        self.assertEqual(full["timers"]["metro.dijkstra"]["calls"], 1)
+        self.assertGreaterEqual(full["counters"]["metro.heap_pops"], self.metro.get_n())
+        self.assertEqual(query["timers"]["metro.shortest_path.dijkstra"]["calls"], 1)
+        self.assertLess(query["counters"]["metro.heap_pops"], full["counters"]["metro.heap_pops"])
+
+    def test_freeze(self):
+        frozen = self.metro.freeze()
+        expected = self.metro.shortest_path("s1", "s17")
+        self.assertEqual(frozen.shortest_path("s1", "s17"), expected)
+        self.assertEqual(frozen.shortest_path("s1", "s17", "bidirectional"), expected)
+        self.assertEqual(dijkstra_output(frozen, "s8"), dijkstra_output(self.metro, "s8"))
+        self.assertRaises(ValueError, frozen.set_segment_weight, "s13", "s14", 1)
+        self.assertRaises(ValueError, frozen.add_line, "M9", [("s1", 0), ("s99", 3)])
+        self.assertNotIn("s99", frozen.get_stations())
+
+        thawed = frozen.thaw()
+        thawed.set_segment_weight("s13", "s14", 1)
+        thawed.add_line("M9", [("s1", 0), ("s99", 3)])
+        self.assertEqual(thawed.shortest_path("s1", "s17").distance, 25)
+        self.assertEqual(frozen.shortest_path("s1", "s17"), expected)
+        self.assertNotIn("s99", frozen.get_stations())
+
+    def test_server_queries(self):
+        async def scenario():
+            server = MetroServer(self.metro, cache_size=2)
+            routes = await asyncio.gather(*(server.query("s1", "s17") for _ in range(20)))
+            expected = self.metro.shortest_path("s1", "s17")
+            self.assertEqual(routes[0]["stations"], expected.stations)
+            self.assertEqual(routes[0]["transfers"], [["s13", "M1", "M4"]])
+            self.assertEqual(await server.query("s1", "s17"), routes[0])
+            stats = server.stats()
+            self.assertEqual((stats["requests"], stats["computed"], stats["coalesced"], stats["cache_hits"]),
+                             (21, 1, 19, 1))
+            self.assertIn("p99", stats["latency_ms"])
+
+            self.metro.set_segment_weight("s13", "s14", 1)
+            self.assertEqual((await server.query("s1", "s17"))["distance"], 25)
+            await server.query("s1", "s8")
+            await server.query("s8", "s1", "bidirectional")
+            self.assertEqual(server.stats()["cached"], 2)
+            with self.assertRaises(ValueError):
+                await server.query("s1", "s99")
+            self.assertEqual(server.stats()["errors"], 1)
+
+        asyncio.run(scenario())
+
+    def test_server_protocol(self):
+        async def scenario():
+            server = MetroServer(self.metro, workers=2)
+            host, port = await server.start()
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                requests = [{"id": 1, "from": "s1", "to": "s17"}, {"id": 2, "from": "s1", "to": "s99"},
+                            {"id": 3, "from": "s8", "to": "s14", "method": "bidirectional"},
+                            {"id": 5, "from": "s1", "to": "s17", "method": []},
+                            {"id": 6, "from": "s1", "to": "s17", "method": "teleport"}]
+                writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests) + b"[]\n")
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(6)]
+                writer.write(b'{"id": 4, "stats": true}\n')
+                writer.write_eof()
+                stats = json.loads(await reader.readline())
+                writer.close()
+            finally:
+                await server.close()
+
+            answers = {response.get("id"): response for response in responses}
+            self.assertEqual(answers[1]["route"]["distance"], 27)
+            self.assertIn("does not exist", answers[2]["error"])
+            self.assertEqual(answers[3]["route"]["distance"], self.metro.shortest_path("s8", "s14").distance)
+            self.assertEqual(answers[None]["error"], "A request must be a JSON object")
+            self.assertEqual(answers[5]["error"], "Unknown routing method: []")
+            self.assertEqual(answers[6]["error"], "Unknown routing method: teleport")
+            self.assertEqual((stats["id"], stats["stats"]["requests"], stats["stats"]["computed"]), (4, 5, 2))
+
+        asyncio.run(scenario())
+
+    def test_contraction_hierarchy(self):
+        self.assertRaises(ValueError, self.metro.shortest_path, "s1", "s17", "hierarchy")
+        hierarchy = self.metro.prepare_hierarchy()
+        for start_station in self.metro.get_stations():
+            for end_station in self.metro.get_stations():
+                expected = self.metro.shortest_path(start_station, end_station)
+                route = self.metro.shortest_path(start_station, end_station, "hierarchy")
+                self.assertEqual(route.distance, expected.distance)
+                self.assertIs(type(route.distance), int)
+                self.assertEqual((route.stations[0], route.stations[-1]), (start_station, end_station))
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "metro.ch")
+            hierarchy.save(file_name)
+            other = Metro()
+            other.create_metro_from_file("input.txt")
+            other.prepare_hierarchy(ContractionHierarchy.load(file_name))
+        self.assertEqual(other.shortest_path("s1", "s17", "hierarchy"), self.metro.shortest_path("s1", "s17"))
+        self.assertIs(type(other.shortest_path("s1", "s17", "hierarchy").distance), int)
+        self.metro.set_segment_weight("s1", "s2", 1)
+        self.assertRaises(ValueError, self.metro.shortest_path, "s1", "s17", "hierarchy")
+
+    def test_implicit_transfers(self):
+        implicit = Metro(transfers="implicit")
+        implicit.create_metro_from_file("input.txt")
+        self.assertLess(len(implicit.get_edges()), len(self.metro.get_edges()))
+        stations = self.metro.get_stations()
+        implicit.prepare_hierarchy()
+        for start_station in stations:
+            for end_station in stations:
+                expected = self.metro.shortest_path(start_station, end_station)
+                for method in ("dijkstra", "bidirectional", "hierarchy"):
+                    self.assertEqual(implicit.shortest_path(start_station, end_station, method).distance,
+                                     expected.distance)
+        self.assertEqual(implicit.shortest_path("s1", "s17"), self.metro.shortest_path("s1", "s17"))
+        for node in (0, 12, 20):
+            self.assertEqual(implicit.successors(node), list(self.metro.successors(node)))
+            self.assertEqual(implicit.predecessors(node), list(self.metro.predecessors(node)))
+        self.assertEqual(list(implicit.iter_vertex(0)), list(self.metro.iter_vertex(0)))
+        self.assertEqual(implicit.strongly_connected_components(), self.metro.strongly_connected_components())
+        self.assertEqual((implicit.component_count(), implicit.same_component(0, 28)), (1, True))
+        self.assertRaises(ValueError, Metro, False, transfers="implicit")
+
+        for metro in (self.metro, implicit):
+            for penalty in (0, -1):
+                self.assertRaises(ValueError, metro.set_transfer_penalty, "s13", penalty)
+            self.assertEqual(metro.shortest_path("s1", "s17").distance, 27)
+            self.assertEqual(len(metro.set_transfer_penalty("s13", 10)), 1)
+            self.assertEqual(metro.get_transfer_penalty("s13"), 10)
+        self.assertEqual(implicit.shortest_path("s1", "s17"), self.metro.shortest_path("s1", "s17"))
+        self.assertRaises(ValueError, implicit.shortest_path, "s1", "s17", "hierarchy")
+
+        table = StationDistanceTable(implicit).build()
+        table.close_line("M5")
+        self.metro.close_line("M5")
+        self.assert_table_matches(table, self.metro)
+        self.assertEqual(implicit.component_count(), self.metro.component_count())
+        self.assertRaises(ValueError, implicit.close_line, "M5")
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "metro.bin")
+            implicit.save_binary(file_name)
+            loaded = Metro.load_binary(file_name)
+            self.assertEqual(loaded.get_transfer_model(), "implicit")
+            self.assertEqual(dijkstra_output(loaded, "s8"), dijkstra_output(self.metro, "s8"))
+            del loaded
+
+    def assert_table_matches(self, table, metro=None):
+        metro = metro or self.metro
+        for start_station in metro.get_stations():
+            for end_station in metro.get_stations():
+                expected = metro.shortest_path(start_station, end_station)
+                route = table.route(start_station, end_station)
+                self.assertEqual(table.distance(start_station, end_station),
+                                 expected.distance if expected else float('inf'))
+                if expected:
+                    self.assertEqual(route.distance, expected.distance)
+                    self.assertEqual((route.stations[0], route.stations[-1]), (start_station, end_station))
+
+    def test_station_table(self):
+        for method in ("dijkstra", "floyd_warshall"):
+            self.assert_table_matches(StationDistanceTable(self.metro).build(method))
+        table = StationDistanceTable(self.metro).build(workers=2)
+        self.assert_table_matches(table)
+        self.assertEqual(table.route("s1", "s17"), self.metro.shortest_path("s1", "s17"))
+
+        updated = table.set_segment_weight("s13", "s14", 1, "M4")
+        self.assertTrue(table.is_current())
+        self.assertIn("s1", updated)
+        self.assertLess(len(updated), len(self.metro.get_stations()))
+        self.assert_table_matches(table)
+        for segment in (("nope", "s14", 1), ("s13", "nope", 1), ("s13", "s14", 0), ("s13", "s14", -2)):
+            self.assertRaises(ValueError, table.set_segment_weight, *segment)
+        self.assertTrue(table.is_current())
+        updated = table.set_segment_weight("s5", "s6", 30)
+        self.assertLess(len(updated), len(self.metro.get_stations()))
+        self.assert_table_matches(table)
+        table.close_line("M5")
+        self.assertEqual(table.distance("s11", "s16"), float('inf'))
+        self.assert_table_matches(table)
+        self.metro.set_segment_weight("s1", "s2", 9)
+        self.assertFalse(table.is_current())
+        self.assertRaises(ValueError, table.distance, "s1", "s17")
+        self.assertRaises(ValueError, table.route, "s1", "s17")
+        table.build()
+        self.assert_table_matches(table)
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "table.bin")
+            table.save(file_name)
+            loaded = StationDistanceTable.load(file_name, self.metro)
+            self.assert_table_matches(loaded)
+
+    def test_binary_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, "metro.bin")
+            self.metro.save_binary(file_name)
+            loaded = Metro.load_binary(file_name)
+            self.assertEqual(dijkstra_output(loaded, "s8"), dijkstra_output(self.metro, "s8"))
+            self.assertEqual(loaded.shortest_path("s1", "s17"), self.metro.shortest_path("s1", "s17"))
+            del loaded
+
+
+if __name__ == '__main__':
+    unittest.main()
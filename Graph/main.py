@@ -1,11 +1,21 @@
 from Graph import Graph
+from GraphErrors import CycleError, NotEulerianError
 from Metro import Metro
 
 
 def postorder_traversal(root):
-    if not root:
-        return []
-    return postorder_traversal(root.left) + postorder_traversal(root.right) + [root.value]
+    # Reversed (root, right, left) preorder is the postorder, no recursion needed
+    values = []
+    stack = [root] if root else []
+    while stack:
+        node = stack.pop()
+        values.append(node.value)
+        if node.left:
+            stack.append(node.left)
+        if node.right:
+            stack.append(node.right)
+    values.reverse()
+    return values
 
 
 def print_menu(graph):
@@ -107,17 +117,19 @@ if __name__ == "__main__":
                     else:
                         print("The graph is not a DAG.")
                 elif command == "13":
-                    if graph.is_dag():
-                        print("Topological Sort: ", graph.topological_sort())
-                    else:
-                        print("The graph is not a DAG, cannot perform topological sort.")
+                    try:
+                        layers = graph.topological_layers()
+                        print("Topological Sort: ", [vertex for layer in layers for vertex in layer])
+                        print("Layers: ", layers)
+                    except CycleError as error:
+                        print(f"{error}, cannot perform topological sort.")
                 elif command == "14":
                     start_vertex = int(input("Enter start vertex: "))
                     end_vertex = int(input("Enter end vertex: "))
-                    if graph.is_dag():
+                    try:
                         print(f"Number of distinct paths from {start_vertex} to {end_vertex}: {graph.count_paths(start_vertex, end_vertex)}")
-                    else:
-                        print("The graph is not a DAG, cannot count distinct paths.")
+                    except CycleError as error:
+                        print(f"{error}, cannot count distinct paths.")
                 elif command == "15":
                     inorder = list(map(int, input("Enter inorder traversal (space-separated): ").split()))
                     preorder = list(map(int, input("Enter preorder traversal (space-separated): ").split()))
@@ -136,11 +148,10 @@ if __name__ == "__main__":
                     else:
                         print("The graph is not Eulerian.")
                 elif command == "17":
-                    if graph.is_eulerian():
-                        circuit = graph.find_eulerian_circuit()
-                        print("Eulerian Circuit:", circuit)
-                    else:
-                        print("The graph is not Eulerian.")
+                    try:
+                        print("Eulerian Circuit:", graph.find_eulerian_circuit())
+                    except NotEulerianError as error:
+                        print(f"The graph is not Eulerian: {error}")
                 elif command == "0":
                     break
                 else: